@@ -1,15 +1,32 @@
 import os
 import cv2
+import json
+import time
 import platform
+import argparse
+import threading
 import numpy as np
 import tkinter as tk
 from tkinter import filedialog
 from PIL import Image, ImageTk
 from datetime import datetime
-from natsort import natsorted
+from arena import FrameArena
+from capture import FrameRing, CaptureThread
+from sources import open_source, BACKENDS
+from render import RenderEngine
+from scheduler import FrameScheduler
+from instrumentation import Instrumentation
+from processing import StereoProcessor
+
+# Recording formats offered in the control panel, as StreamingRecorder options
+RECORDING_FORMATS = {
+    "AVI": {},
+    "Stereo": {"container": True},
+    "Stereo lossless": {"container": True, "compression": "lossless"},
+}
 
 class CameraApp:
-    def __init__(self, root):
+    def __init__(self, root, source_config=None, stream_address=None):
         # Store all parameters
         self.root = root
         self.root.withdraw()  # Hide the root window
@@ -18,11 +35,24 @@ class CameraApp:
         self.spacing_ratio = 0.5    # Initial spacing ratio
         self.offset_ratio = 0.0     # Initial offset ratio
 
-        # Open the camera
-        self.cap = cv2.VideoCapture(0)
-        if not self.cap.isOpened():
-            raise Exception("Could not open video device")
-        self.cap_fps = self.cap.get(cv2.CAP_PROP_FPS)
+        # Pipeline timers, off until the performance overlay is shown
+        self.instrumentation = Instrumentation()
+        self.instrumentation.mark_startup("app")
+        self.hud_updated = 0.0
+
+        # Capture runs on its own thread; display and recorder read the ring independently
+        # into buffers from a shared arena, so steady-state frames allocate nothing.
+        # The camera is found and opened on that thread too, so the windows never wait for it
+        self.cap_fps = None         # known once the camera is connected
+        self.connects = 0
+        self.device_status = None   # status text shown while no live frames arrive
+        self.startup_report = False  # exit after the first frame with the startup timings
+        self.arena = FrameArena()
+        self.display_pair = None
+        self.frame_ring = FrameRing(slots=8)
+        self.capture_thread = CaptureThread(None, self.frame_ring, instrumentation=self.instrumentation,
+                                            open_source=lambda: open_source(source_config))
+        self.display_reader = self.frame_ring.reader("display")
 
         # Link to display and control panel
         self.control_panel = ControlPanel(self)
@@ -30,160 +60,583 @@ class CameraApp:
 
         # Camera state
         self.preview = True  # Start in live preview mode
-        self.frame_num = 0
-        self.loaded_frames = []
+        self.left_frame = None
+        self.right_frame = None
+        self.playback = None
+        self.playback_cache_mb = 512    # Memory budget for decoded playback frames
         self.recording = False
-        self.recorded_frames = []
-        self.delay = int(1000/self.cap_fps)
+        self.recorder = None
+        self.max_segment_mb = 2048          # Rotate recording files at this size
+        self.max_segment_seconds = None     # or after this many seconds
+        self.recording_format = "AVI"       # one of RECORDING_FORMATS
+        self.prepend_replay = True          # save the replay buffer alongside each new recording
+
+        # Snapshots and bursts are encoded on a worker pool into a folder chosen once per session
+        self.session_folder = None
+        self.snapshot_format = "png"
+        self.snapshot_level = 1             # PNG compression 0-9, or JPEG quality
+        self.burst_seconds = 3
+        self.snapshots = None               # started on the first snapshot
+
+        # Optional MJPEG server for viewers on the network, fed from the ring like the recorder
+        self.stream_server = None
+        if stream_address is not None:
+            from streaming import StreamServer    # http.server is only loaded when streaming
+            self.stream_server = StreamServer(self.frame_ring, *stream_address)
+
+        # Always-on pre-record buffer of the last seconds of live frames, started once the windows are up
+        self.replay_buffer = None
+        self.scheduler = FrameScheduler(self.cap_fps)
+
+        # Stereo calibration and per-frame rectification; feature modules load on first use so the
+        # windows appear sooner
+        self.calibrator = None
+        self.calibration_polling = False
+        self.rectifier = None
+        self.rectify_enabled = False
+
+        # Lens shading calibration and correction
+        self.flat_field = None
+        self.collecting_flat_field = False
+        self.shading = None
+        self.shading_enabled = False
+
+        # Per-eye exposure, gain, white balance and denoising from the camera sliders
+        self.processor = StereoProcessor()
+
+        # Disparity overlay, computed in a worker process at a few updates per second
+        self.depth_preview = None
+        self.depth_enabled = False
+
+        # Colour correction, kept across sessions in the settings folder
+        self.settings_folder = os.path.join(os.path.expanduser("~"), ".endoscope_gui")
+        self.color_correction_path = os.path.join(self.settings_folder, "color_correction.npz")
+        self.color_correction = None
+        self.color_fit_thread = None
+        self.color_fit_result = None
+        self.color_enabled = False
+
+        # Index of recorded sessions, kept in the settings folder and loaded when first browsed
+        self.library = None
+
+        # Counters shown on the performance overlay
+        self.instrumentation.add_counter("achieved fps", self.scheduler.achieved_fps)
+        self.instrumentation.add_counter("jitter ms", self.scheduler.jitter_ms)
+        self.instrumentation.add_counter("display dropped", lambda: self.display_reader.dropped)
+        self.instrumentation.add_counter("ring overwritten", lambda: self.frame_ring.overwritten)
+        self.instrumentation.add_counter("failed reads", lambda: self.capture_thread.failed_reads)
+        self.instrumentation.add_counter("pool hits", lambda: self.arena.hits)
+        self.instrumentation.add_counter("pool misses", lambda: self.arena.misses)
+        self.instrumentation.add_counter("pool steady misses", self.arena.steady_state_misses)
+        self.instrumentation.add_counter("unpooled steady allocs", self.arena.steady_state_unpooled)
+        self.instrumentation.add_counter("denoise late", lambda: self.processor.frames_late)
+        self.instrumentation.add_counter("denoise quality", lambda: self.processor.quality)
+        self.instrumentation.add_counter(
+            "snapshots pending mb", lambda: self.snapshots.stats()["pending_mb"] if self.snapshots is not None else 0)
+        self.instrumentation.add_counter(
+            "stream viewers", lambda: len(self.stream_server.clients) if self.stream_server is not None else 0)
+        self.instrumentation.add_counter(
+            "replay seconds", lambda: self.replay_buffer.seconds() if self.replay_buffer is not None else 0)
+        self.instrumentation.add_counter(
+            "replay mb", lambda: self.replay_buffer.stats()["mb"] if self.replay_buffer is not None else 0)
+        self.instrumentation.add_counter(
+            "recorder dropped", lambda: self.recorder.stats()["dropped"] if self.recorder is not None else 0)
 
     def run(self):
         """Start capturing and displaying images continuously."""
+        # Start looking for the camera first, then get the windows on screen while it opens
+        self.capture_thread.start()
+        self.root.update()
+        self.device_status = self.capture_thread.status
+        self.display_window.show_status(self.device_status)
+        self.root.update_idletasks()
+        self.instrumentation.mark_startup("window")
+
+        # Features needed from the first frames on, loaded now the windows are showing
+        from replay import ReplayBuffer
+        self.replay_buffer = ReplayBuffer(budget_mb=256, max_seconds=30, arena=self.arena)
+        self.replay_buffer.start(self.frame_ring.reader("replay"))
+        if os.path.exists(self.color_correction_path):
+            from color import ColorCorrection
+            self.color_correction = ColorCorrection.load(self.color_correction_path)
+            self.control_panel.update_color_status("Loaded saved correction")
+        if self.stream_server is not None:
+            self.stream_server.start()
         self.capture_and_display()
         self.root.mainloop()
 
     def capture_and_display(self):
+        instrumentation = self.instrumentation
+        mark = instrumentation.mark()
         if self.preview:
-            # Live preview mode
-            ret, frame = self.cap.read()
-            if not ret:
-                print("Warning: Failed to capture frame.")
-                self.root.after(100, self.capture_and_display) # retry
+            # Live preview mode shows only the newest captured frame
+            latest = self.display_reader.latest(arena=self.arena)
+            if latest is None:
+                self.update_device_status()
+                self.root.after(5, self.capture_and_display)  # no new frame yet
                 return
-
-            # Split frame into left and right views
-            square_size = min(frame.shape[0], frame.shape[1])
-            left_frame = frame[:square_size, :square_size]
-            right_frame = frame[-square_size:, -square_size:]
-
-            # Save frame to recorded_frames if recording
-            if self.recording:
-                self.recorded_frames.append((left_frame, right_frame))
+            left_frame, right_frame, timestamp, seq = latest
+            if self.device_status is not None:
+                self.first_frame_shown()
+
+            # The previous pair goes back to the arena now nothing refers to it
+            self.arena.release_pair(self.display_pair)
+            self.display_pair = (left_frame, right_frame)
+            self.scheduler.observe_source(seq, timestamp)
+            instrumentation.begin_frame()
+            self.left_frame, self.right_frame = left_frame, right_frame
+            mark = instrumentation.lap("ring_read", mark)
+            if self.collecting_flat_field:
+                self.collect_flat_field(left_frame, right_frame)
+            left_frame, right_frame = self.process_pair(left_frame, right_frame)
+            mark = instrumentation.lap("process", mark)
 
             # Display frames
-            self.left_img_pil = Image.fromarray(cv2.cvtColor(left_frame, cv2.COLOR_BGR2RGB))
-            self.right_img_pil = Image.fromarray(cv2.cvtColor(right_frame, cv2.COLOR_BGR2RGB))
-            self.display_window.display_stereo_images(self.left_img_pil, self.right_img_pil)
+            self.display_window.display_stereo_images(left_frame, right_frame, mark)
+            if instrumentation.enabled:
+                instrumentation.record("capture_to_display", (time.perf_counter() - timestamp) * 1000, in_frame=True)
 
         else:
-            # Playback mode
-            left_frame, right_frame = self.loaded_frames[self.frame_num]
-            self.frame_num += 1
-            if self.frame_num >= len(self.loaded_frames):
-                self.frame_num = 0
+            # Playback mode decodes on demand; the engine prefetches ahead on its own thread
+            instrumentation.begin_frame()
+            left_frame, right_frame = self.playback.next_frame()
+            mark = instrumentation.lap("decode", mark)
+            left_frame, right_frame = self.process_pair(left_frame, right_frame)
+            mark = instrumentation.lap("process", mark)
+            self.display_window.display_stereo_images(left_frame, right_frame, mark)
+        instrumentation.end_frame()
+
+        # Depth is fed only after the frame is on screen and never waits for the worker
+        if self.depth_enabled:
+            self.update_depth(left_frame, right_frame)
+
+        # Refresh the performance overlay a couple of times per second
+        if self.display_window.hud is not None and time.perf_counter() - self.hud_updated > 0.5:
+            self.display_window.show_hud(instrumentation.hud_text())
+            self.hud_updated = time.perf_counter()
+
+        # Schedule next frame against an absolute deadline, skipping playback frames we fell behind on
+        delay, skipped = self.scheduler.tick()
+        if skipped and not self.preview and not self.playback.paused:
+            self.playback.step(speed=self.playback.speed * skipped)
+        self.root.after(delay, self.capture_and_display)
+
+    def update_device_status(self):
+        """Pick up a newly connected camera and show the connection state while no frames arrive."""
+        capture_thread = self.capture_thread
+        source = capture_thread.source
+        if capture_thread.connects != self.connects and source is not None:
+            self.connects = capture_thread.connects
+            self.cap_fps = source.fps
+            if self.preview:
+                self.scheduler.set_fps(self.cap_fps)
+        if not capture_thread.streaming and capture_thread.status != self.device_status:
+            self.device_status = capture_thread.status
+            self.display_window.show_status(self.device_status)
+
+    def first_frame_shown(self):
+        """Clear the connection status once live frames arrive."""
+        self.device_status = None
+        self.display_window.hide_status()
+        if "first frame" not in self.instrumentation.startup:
+            self.instrumentation.mark_startup("first frame")
+            self.root.after(3000, self.arena.mark_steady)  # buffers are all sized by now
+            if self.startup_report:
+                self.root.after_idle(self.report_startup)
+
+    def report_startup(self):
+        """Print the startup milestones as JSON and exit, for the startup benchmark."""
+        print("Startup:", json.dumps(self.instrumentation.startup))
+        self.on_close()
+
+    def process_pair(self, left_frame, right_frame):
+        """Apply the enabled corrections to a stereo pair before it is displayed."""
+        if self.shading_enabled and self.shading is not None:
+            left_frame, right_frame = self.shading.apply(left_frame, right_frame)
+        if self.color_enabled and self.color_correction is not None:
+            left_frame, right_frame = self.color_correction.apply(left_frame, right_frame)
+        left_frame, right_frame = self.processor.process(left_frame, right_frame)
+        if self.rectify_enabled and self.rectifier is not None:
+            left_frame, right_frame = self.rectifier.rectify(left_frame, right_frame)
+        return left_frame, right_frame
+
+    def update_depth(self, left_frame, right_frame):
+        """Show the newest finished disparity map, then hand the current pair to the worker if it is free."""
+        result = self.depth_preview.poll()
+        if result is not None:
+            coloured, disparity = result
+            text = f"Disparity {self.depth_preview.scale:.2f}x, {self.depth_preview.compute_ms:.0f} ms"
+            if self.depth_preview.worker_failures:
+                text += f", {self.depth_preview.worker_failures} worker restarts"
+            if disparity and self.rectify_enabled and self.rectifier is not None:
+                calibration = self.rectifier.calibration
+                depth = calibration.P1[0, 0] * abs(float(calibration.T[0, 0])) / disparity
+                text += f"\nCentre depth {depth:.0f} mm"
+            self.display_window.show_depth(coloured, text)
+        rectified = self.rectify_enabled and self.rectifier is not None
+        self.depth_preview.submit(left_frame, right_frame, rectified)
+
+    def set_depth(self, enabled):
+        if enabled and self.depth_preview is None:
+            from depth import DepthPreview
+            self.depth_preview = DepthPreview()
+        self.depth_enabled = enabled
+        if not enabled:
+            self.display_window.hide_depth()
 
-            # Convert frames to PIL images for display
-            left_img_pil = Image.fromarray(cv2.cvtColor(left_frame, cv2.COLOR_BGR2RGB))
-            right_img_pil = Image.fromarray(cv2.cvtColor(right_frame, cv2.COLOR_BGR2RGB))
-            self.display_window.display_stereo_images(left_img_pil, right_img_pil)
+    def start_recording(self):
+        """Start streaming frames captured from now on to disk, preceded by the replay buffer."""
+        folder = self.get_session_folder()
+        if not folder:
+            return
 
-        # Schedule next frame based on FPS
-        self.root.after(self.delay, self.capture_and_display)
+        from recorder import StreamingRecorder
+        self.recorder = StreamingRecorder(folder, self.scheduler.fps,
+                                          max_segment_mb=self.max_segment_mb,
+                                          max_segment_seconds=self.max_segment_seconds,
+                                          instrumentation=self.instrumentation, arena=self.arena,
+                                          **RECORDING_FORMATS[self.recording_format])
+        self.recorder.start(self.frame_ring.reader("recorder"))
+
+        # The pre-roll goes to its own file, named by its start time so it sorts before the recording
+        if self.prepend_replay:
+            self.replay_buffer.flush(folder, self.scheduler.fps, **RECORDING_FORMATS[self.recording_format])
+        self.recording = True
+        self.display_window.show_recording_indicator()
+
+    def save_replay(self):
+        """Write the last seconds of live frames to disk in the background."""
+        folder = self.get_session_folder()
+        if not folder:
+            return
+        self.replay_buffer.flush(folder, self.scheduler.fps, **RECORDING_FORMATS[self.recording_format])
+
+    def get_session_folder(self):
+        """Folder for everything saved this session, asked for the first time it is needed."""
+        if self.session_folder is None:
+            self.choose_session_folder()
+        return self.session_folder
+
+    def get_snapshot_writer(self):
+        """Worker pool that encodes snapshots and bursts, started the first time one is taken."""
+        if self.snapshots is None:
+            from snapshot import SnapshotWriter
+            self.snapshots = SnapshotWriter(self.snapshot_format, self.snapshot_level, arena=self.arena)
+        return self.snapshots
+
+    def choose_session_folder(self):
+        folder = filedialog.askdirectory(title="Select Folder to Save Media", initialdir=os.getcwd())
+        if folder:
+            self.session_folder = folder
+            self.control_panel.update_folder_label(folder)
 
     def save_image(self):
-        # Get currently displayed image
-        left_img_pil = self.left_img_pil
-        right_img_pil = self.right_img_pil
-        if not isinstance(left_img_pil, Image.Image) or not isinstance(right_img_pil, Image.Image):
-            print("Error: One of the images is not a PIL.Image instance")
+        """Queue the newest captured pair, at source resolution and before any processing, for saving."""
+        folder = self.get_session_folder()
+        if not folder:
             return
+        self.get_snapshot_writer().snapshot(self.frame_ring, folder)
 
-        folder = filedialog.askdirectory(title="Select Folder to Save Image", initialdir=os.getcwd())
+    def capture_burst(self):
+        """Save every captured pair for the next few seconds without holding up the display."""
+        folder = self.get_session_folder()
         if not folder:
             return
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        left_path = os.path.join(folder, f"{timestamp}_left_image.png")
-        right_path = os.path.join(folder, f"{timestamp}_right_image.png")
-
-        # Convert from PIL to OpenCV format
-        left_img_cv = cv2.cvtColor(np.array(left_img_pil), cv2.COLOR_RGB2BGR)
-        right_img_cv = cv2.cvtColor(np.array(right_img_pil), cv2.COLOR_RGB2BGR)
-        
-        # Save the images
-        cv2.imwrite(left_path, left_img_cv)
-        cv2.imwrite(right_path, right_img_cv)
-        print(f"Saved stereo images: {left_path} and {right_path}")
+        self.get_snapshot_writer().burst(self.frame_ring, folder, self.burst_seconds)
 
     def save_recording(self):
         # Stop recording mode
         self.recording = False
         self.display_window.hide_recording_indicator()
 
-        folder = filedialog.askdirectory(title="Select Folder to Save Video", initialdir=os.getcwd())
-        if not folder:
-            return
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        left_path = os.path.join(folder, f"{timestamp}_left_video.avi")
-        right_path = os.path.join(folder, f"{timestamp}_right_video.avi")
-
-        # Set up video writers
-        height, width = self.recorded_frames[0][0].shape[:2]
-        fourcc = cv2.VideoWriter_fourcc(*'XVID')
-        left_writer = cv2.VideoWriter(left_path, fourcc, self.cap_fps, (width, height))
-        right_writer = cv2.VideoWriter(right_path, fourcc, self.cap_fps, (width, height))
-        
-        # Write frames to video files
-        for left_frame, right_frame in self.recorded_frames:
-            left_writer.write(left_frame)
-            right_writer.write(right_frame)
-        
-        # Release video writers
-        left_writer.release()
-        right_writer.release()
-        print(f"Saved stereo videos: {left_path} and {right_path}")
+        # Frames are already on disk; the writers only flush their short queues
+        if self.recorder is not None:
+            self.recorder.stop()
     
+    def set_recording_format(self, name):
+        self.recording_format = name
+
     def load_media(self):
-        folder = filedialog.askdirectory(title="Select Folder to Load Media", initialdir=os.getcwd())
+        """Browse the sessions in a folder from the media library."""
+        folder = filedialog.askdirectory(title="Select Folder to Load Media",
+                                         initialdir=self.session_folder or os.getcwd())
         if not folder:
             return
+        if self.library is None:
+            from library import MediaLibrary
+            self.library = MediaLibrary(self.settings_folder)
+        LibraryWindow(self, folder)
+
+    def open_session(self, session):
+        """Start playing a session picked from the media library."""
+        from playback import PlaybackEngine, ContainerPlayback, StillImagePlayback
+        if session["kind"] == "stereo":
+            try:
+                playback = ContainerPlayback(session["path"])
+            except IOError as error:
+                print(f"Error: {error}")
+                return
+            fps = playback.fps or self.cap_fps
+            print(f"Loaded stereo recording: {session['path']}")
 
-        for filename in natsorted(os.listdir(folder)):
-            if "left" in filename:
-                left_path = os.path.join(folder, filename)
-            elif "right" in filename:
-                right_path = os.path.join(folder, filename)
-        if not left_path or not right_path:
-            print("Error: Could not find both left and right media files in the selected folder.")
-            return
-        
-        # Setup for playback
-        ext = left_path.split(".")[-1].lower()
-        if ext in ["png", "jpg", "jpeg"]:
+        elif session["kind"] == "image":
             # Load stereo images as a single frame with infinite FPS
-            left_image = cv2.imread(left_path)
-            right_image = cv2.imread(right_path)
-            self.loaded_frames = [(left_image, right_image)]
-            self.delay = self.delay = int(1000/self.cap_fps)
-            print(f"Loaded stereo images: {left_path} and {right_path}")
-
-        elif ext in ["avi", "mp4"]:
-            # Load stereo video frames
-            left_cap = cv2.VideoCapture(left_path)
-            right_cap = cv2.VideoCapture(right_path)
-            self.loaded_frames = []
-
-            # Read frames from both videos and store them in loaded_frames
-            while left_cap.isOpened() and right_cap.isOpened():
-                ret_left, left_frame = left_cap.read()
-                ret_right, right_frame = right_cap.read()
-                if not (ret_left and ret_right):
-                    break
-                self.loaded_frames.append((left_frame, right_frame))
+            left_image = cv2.imread(session["left"])
+            right_image = cv2.imread(session["right"])
+            if left_image is None or right_image is None:
+                print(f"Error: Could not read stereo images: {session['left']} and {session['right']}")
+                return
+            playback = StillImagePlayback(left_image, right_image)
+            fps = self.cap_fps
+            print(f"Loaded stereo images: {session['left']} and {session['right']}")
+
+        else:
+            # Open stereo videos; frames are decoded lazily during playback
+            try:
+                playback = PlaybackEngine(session["left"], session["right"], cache_mb=self.playback_cache_mb)
+            except IOError as error:
+                print(f"Error: {error}")
+                return
 
             # Set FPS from the video file's FPS
-            self.delay = int(1000/left_cap.get(cv2.CAP_PROP_FPS))
-            left_cap.release()
-            right_cap.release()
-            print(f"Loaded stereo videos: {left_path} and {right_path}")
+            fps = playback.fps
+            print(f"Loaded stereo videos: {session['left']} and {session['right']}")
 
+        self.start_playback(playback, fps)
+        self.control_panel.update_button_states()
+
+    def start_playback(self, playback, fps):
+        """Switch to playback mode on a newly loaded source."""
+        if self.playback is not None:
+            self.playback.release()
+        self.playback = playback
+        self.preview = False
+        self.display_window.hide_status()
+        self.scheduler.set_fps(fps)
+
+    def start_preview(self):
+        """Return to live preview at the camera's frame rate."""
+        self.preview = True
+        self.display_reader.skip_to_latest()
+        self.scheduler.set_fps(self.cap_fps)
+        self.device_status = None   # shown again if the camera is still not delivering
+
+    def toggle_pause(self):
+        """Pause or resume playback of loaded media."""
+        if self.playback is not None:
+            self.playback.paused = not self.playback.paused
+
+    def step_playback(self, frames):
+        """Pause playback and step by whole frames; negative steps go backwards."""
+        if self.playback is not None and not self.preview:
+            self.playback.paused = True
+            self.playback.step(frames)
+
+    def change_playback_speed(self, factor):
+        """Scale playback speed, keeping direction, between 1/8x and 8x."""
+        if self.playback is not None:
+            speed = self.playback.speed * factor
+            magnitude = min(max(abs(speed), 0.125), 8.0)
+            self.playback.set_speed(magnitude if speed >= 0 else -magnitude)
+
+    def reverse_playback(self):
+        """Flip the direction of playback."""
+        if self.playback is not None:
+            self.playback.set_speed(-self.playback.speed)
+
+    def toggle_performance_hud(self):
+        """Show or hide the performance overlay, timing the pipeline only while it is shown."""
+        if self.display_window.hud is None:
+            self.instrumentation.reset()
+            self.instrumentation.enabled = True
+            self.display_window.show_hud("Collecting...")
         else:
-            print("Error: Unsupported file format.")
+            self.instrumentation.enabled = False
+            self.display_window.hide_hud()
+
+    def export_performance(self):
+        """Save the collected per-frame timings and summary for offline analysis."""
+        folder = filedialog.askdirectory(title="Select Folder to Save Performance Data", initialdir=os.getcwd())
+        if not folder:
             return
 
-        # Switch to playback mode
-        self.preview = False
-        self.frame_num = 0                   
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        csv_path, json_path = self.instrumentation.export(folder, timestamp)
+        print(f"Saved performance data: {csv_path} and {json_path}")
+
+    def add_calibration_pair(self):
+        """Queue checkerboard detection on the current live stereo pair."""
+        if not self.preview or self.left_frame is None:
+            print("Error: Calibration pairs can only be taken from the live preview.")
+            return
+        if self.get_calibrator().add_pair(self.left_frame, self.right_frame):
+            self.poll_calibration()
+
+    def run_calibration(self):
+        """Solve the stereo calibration from the collected pairs in the background."""
+        calibrator = self.get_calibrator()
+        calibrator.poll()
+        if calibrator.calibrate():
+            self.poll_calibration()
+
+    def get_calibrator(self):
+        """Stereo calibrator, created the first time a pair is taken or a calibration loaded."""
+        if self.calibrator is None:
+            from calibration import StereoCalibrator
+            self.calibrator = StereoCalibrator()
+        return self.calibrator
+
+    def poll_calibration(self):
+        """Collect background calibration results and refresh the status until none are pending."""
+        busy = self.calibrator.poll()
+        calibration = self.calibrator.calibration
+        if calibration is not None and (self.rectifier is None or self.rectifier.calibration is not calibration):
+            from calibration import Rectifier
+            self.rectifier = Rectifier(calibration)
+        self.control_panel.update_calibration_status(self.calibrator.status())
+
+        if busy and not self.calibration_polling:
+            self.calibration_polling = True
+            self.root.after(200, self.continue_polling_calibration)
+
+    def continue_polling_calibration(self):
+        self.calibration_polling = False
+        self.poll_calibration()
+
+    def save_calibration(self):
+        if self.calibrator is None or self.calibrator.calibration is None:
+            print("Error: No stereo calibration to save.")
+            return
+        path = filedialog.asksaveasfilename(title="Save Stereo Calibration", initialdir=os.getcwd(),
+                                            initialfile="stereo_calibration.npz", defaultextension=".npz")
+        if not path:
+            return
+        self.calibrator.calibration.save(path)
+        print(f"Saved stereo calibration: {path}")
+
+    def load_calibration(self):
+        path = filedialog.askopenfilename(title="Load Stereo Calibration", initialdir=os.getcwd(),
+                                          filetypes=[("Stereo calibration", "*.npz")])
+        if not path:
+            return
+        from calibration import StereoCalibration
+        self.get_calibrator().calibration = StereoCalibration.load(path)
+        self.poll_calibration()
+        print(f"Loaded stereo calibration: {path}")
+
+    def set_rectify(self, enabled):
+        self.rectify_enabled = enabled
+
+    def toggle_flat_field(self):
+        """Start or stop averaging live frames of a uniformly lit target."""
+        if self.flat_field is None:
+            from shading import FlatFieldAccumulator
+            self.flat_field = FlatFieldAccumulator()
+        if not self.collecting_flat_field:
+            self.flat_field.reset()
+        self.collecting_flat_field = not self.collecting_flat_field
+        self.control_panel.update_shading_status(self.collecting_flat_field, self.flat_field.count)
+
+    def collect_flat_field(self, left_frame, right_frame):
+        self.flat_field.add(left_frame, right_frame)
+        if self.flat_field.count % 10 == 0:
+            self.control_panel.update_shading_status(True, self.flat_field.count)
+
+    def compute_shading(self):
+        """Derive the lens shading gain maps from the averaged flat field."""
+        self.collecting_flat_field = False
+        shading = self.flat_field.correction() if self.flat_field is not None else None
+        if shading is None:
+            print("Error: Collect flat-field frames before computing lens shading.")
+            return
+        self.shading = shading
+        self.control_panel.update_shading_status(False, self.flat_field.count)
+        print(f"Computed lens shading correction from {self.flat_field.count} frames")
+
+    def save_shading(self):
+        if self.shading is None:
+            print("Error: No lens shading correction to save.")
+            return
+        path = filedialog.asksaveasfilename(title="Save Lens Shading", initialdir=os.getcwd(),
+                                            initialfile="lens_shading.npz", defaultextension=".npz")
+        if not path:
+            return
+        self.shading.save(path)
+        print(f"Saved lens shading correction: {path}")
+
+    def load_shading(self):
+        path = filedialog.askopenfilename(title="Load Lens Shading", initialdir=os.getcwd(),
+                                          filetypes=[("Lens shading", "*.npz")])
+        if not path:
+            return
+        from shading import ShadingCorrection
+        self.shading = ShadingCorrection.load(path)
+        print(f"Loaded lens shading correction: {path}")
+
+    def set_shading(self, enabled):
+        self.shading_enabled = enabled
+
+    def fit_color_chart(self):
+        """Fit per-eye colour correction to a chart in the current live pair, off the UI thread."""
+        if not self.preview or self.left_frame is None:
+            print("Error: The colour chart can only be taken from the live preview.")
+            return
+        if self.color_fit_thread is not None:
+            return
+
+        # Fit on frames as they look after lens shading, which is applied before colour; the
+        # thread gets its own copies as the live buffers are reused
+        left_frame, right_frame = self.left_frame, self.right_frame
+        if self.shading_enabled and self.shading is not None:
+            left_frame, right_frame = self.shading.apply(left_frame, right_frame)
+        left_frame, right_frame = left_frame.copy(), right_frame.copy()
+
+        from color import ColorCorrection
+
+        def fit():
+            self.color_fit_result = ColorCorrection.from_charts(left_frame, right_frame)
+
+        self.control_panel.update_color_status("Fitting...")
+        self.color_fit_thread = threading.Thread(target=fit, name="color-fit", daemon=True)
+        self.color_fit_thread.start()
+        self.root.after(100, self.poll_color_fit)
+
+    def poll_color_fit(self):
+        if self.color_fit_thread.is_alive():
+            self.root.after(100, self.poll_color_fit)
+            return
+        self.color_fit_thread = None
+        correction, report = self.color_fit_result
+        if correction is None:
+            # Keep the previous correction; only a fit that passes is saved
+            print(f"Error: Colour chart fit failed: {report}")
+            self.control_panel.update_color_status(report)
+            return
+
+        self.color_correction = correction
+        os.makedirs(self.settings_folder, exist_ok=True)
+        correction.save(self.color_correction_path)
+        self.control_panel.update_color_status(report)
+        print(f"Fitted colour correction ({report}), saved to {self.color_correction_path}")
+
+    def reset_color_correction(self):
+        """Forget the fitted colour correction, including the saved copy."""
+        self.color_correction = None
+        if os.path.exists(self.color_correction_path):
+            os.remove(self.color_correction_path)
+        self.control_panel.update_color_status("No correction")
+
+    def set_color_correction(self, enabled):
+        self.color_enabled = enabled
+
+    def update_left_camera(self, exposure, gain, white_balance, focus, denoising):
+        """Store new left eye settings; the lookup table is rebuilt at most once per displayed frame."""
+        # Focus is a lens setting with no software equivalent, so only the other values apply here
+        self.processor.left.update(exposure, gain, white_balance, denoising)
+
+    def update_right_camera(self, exposure, gain, white_balance, focus, denoising):
+        """Store new right eye settings; the lookup table is rebuilt at most once per displayed frame."""
+        self.processor.right.update(exposure, gain, white_balance, denoising)
 
     def update_display_settings(self, new_size, new_spacing, new_offset):
         """Update display settings and notify display."""
@@ -194,8 +647,23 @@ class CameraApp:
 
     def on_close(self):
         """Cleanly exit the application."""
-        if self.cap.isOpened():
-            self.cap.release()
+        self.capture_thread.stop()
+        if self.stream_server is not None:
+            self.stream_server.stop()
+        # Features that were never used were never started
+        if self.replay_buffer is not None:
+            self.replay_buffer.stop()
+        for pool in (self.snapshots, self.calibrator, self.depth_preview):
+            if pool is not None:
+                pool.shutdown()
+        self.processor.shutdown()
+        if self.recorder is not None:
+            self.recorder.stop()
+            self.recorder.wait()
+        if self.playback is not None:
+            self.playback.release()
+        if self.capture_thread.source is not None:
+            self.capture_thread.source.release()
         self.root.destroy()
 
 class DisplayWindow:
@@ -219,6 +687,18 @@ class DisplayWindow:
         # exit on close
         self.display_window.protocol("WM_DELETE_WINDOW", app.on_close)
 
+        # Playback controls: space pauses, arrows step and change speed, r reverses
+        self.display_window.bind("<space>", lambda event: app.toggle_pause())
+        self.display_window.bind("<Left>", lambda event: app.step_playback(-1))
+        self.display_window.bind("<Right>", lambda event: app.step_playback(1))
+        self.display_window.bind("<Up>", lambda event: app.change_playback_speed(2.0))
+        self.display_window.bind("<Down>", lambda event: app.change_playback_speed(0.5))
+        self.display_window.bind("r", lambda event: app.reverse_playback())
+
+        # Performance overlay: p toggles it, e exports the collected data
+        self.display_window.bind("p", lambda event: app.toggle_performance_hud())
+        self.display_window.bind("e", lambda event: app.export_performance())
+
         # Create a canvas filling the whole window
         self.canvas = tk.Canvas(self.display_window, bg="black")
         self.canvas.pack(fill="both", expand=True)
@@ -226,51 +706,54 @@ class DisplayWindow:
         # Bind <Configure> (resize or reposition) to update_parameters for dynamic resizing
         self.canvas.bind("<Configure>", lambda event: self.update_parameters(self.app))
 
+        # Both views are drawn as one image item backed by a single reused PhotoImage
+        self.render_engine = RenderEngine()
+        self.photo = None
+        self.image_id = self.canvas.create_image(0, 0, anchor="nw")
+
         # Initial calculation of x, y, width, and height for the two displays
         self.update_parameters(app)
 
-        # Create a dummy image to initialize left and right images on the canvas
-        dummy_image = Image.new("RGB", (self.display_size, self.display_size), "black")
-        dummy_img_tk = ImageTk.PhotoImage(dummy_image)
-        self.left_image_id = self.canvas.create_image(self.left_x, self.y, anchor="center", image=dummy_img_tk)
-        self.right_image_id = self.canvas.create_image(self.right_x, self.y, anchor="center", image=dummy_img_tk)
-        
         self.recording_indicator = None
+        self.hud = None
+        self.depth_id = None
+        self.depth_text = None
+        self.depth_photo = None
+        self.status_id = None
 
     def update_parameters(self, app):
         """Recalculate x, y, width, height for the displays based on app parameters."""
         canvas_width = self.canvas.winfo_width()
         canvas_height = self.canvas.winfo_height()
 
-        display_size = max(int(canvas_width * app.size_ratio), 1)
-        center_spacing = int(canvas_width * app.spacing_ratio / 2)
-        center_offset = int(canvas_width * app.offset_ratio)
-
-        self.left_x = (canvas_width // 2) - center_spacing + center_offset
-        self.right_x = (canvas_width // 2) + center_spacing + center_offset
-        self.y = canvas_height // 2
-        self.display_size = display_size
-
-    def display_stereo_images(self, left_img_pil, right_img_pil):
-        """Display the stereo pair of PIL images on the canvas."""
-        
-        # Resize both left and right images to the display size
-        left_img_resized = left_img_pil.resize((self.display_size, self.display_size), Image.LANCZOS)
-        right_img_resized = right_img_pil.resize((self.display_size, self.display_size), Image.LANCZOS)
-
-        # Convert PIL images to ImageTk format for Tkinter compatibility
-        left_img_tk = ImageTk.PhotoImage(left_img_resized)
-        right_img_tk = ImageTk.PhotoImage(right_img_resized)
-
-        # Update the left and right images on the canvas
-        self.canvas.coords(self.left_image_id, self.left_x, self.y)
-        self.canvas.coords(self.right_image_id, self.right_x, self.y)
-        self.canvas.itemconfig(self.left_image_id, image=left_img_tk)
-        self.canvas.itemconfig(self.right_image_id, image=right_img_tk)
-
-        # Store references to avoid garbage collection
-        self.canvas.left_image_ref = left_img_tk
-        self.canvas.right_image_ref = right_img_tk
+        engine = self.render_engine
+        if not engine.set_geometry(canvas_width, canvas_height,
+                                   app.size_ratio, app.spacing_ratio, app.offset_ratio):
+            return  # Layout unchanged, keep the current buffers
+
+        self.left_x = engine.left_x
+        self.right_x = engine.right_x
+        self.y = engine.y
+        self.display_size = engine.display_size
+
+        # Allocate the PhotoImage once per layout and reuse it for every frame. The strip is wrapped
+        # once too: an RGBA image made with frombuffer shares the strip's memory
+        height, width = engine.strip.shape[:2]
+        self.photo = ImageTk.PhotoImage("RGBA", (width, height))
+        self.strip_image = Image.frombuffer("RGBA", (width, height), engine.strip, "raw", "RGBA", 0, 1)
+        self.canvas.coords(self.image_id, engine.origin_x, engine.origin_y)
+        self.canvas.itemconfig(self.image_id, image=self.photo)
+
+    def display_stereo_images(self, left_frame, right_frame, mark=None):
+        """Display the stereo pair of BGR frames on the canvas."""
+        strip = self.render_engine.compose(left_frame, right_frame)
+        mark = self.app.instrumentation.lap("render", mark)
+
+        # Blit the composited pixels into the existing PhotoImage. Pillow only hands Tk contiguous
+        # blocks, so paste still copies the mapped strip into a new block each frame; count it
+        self.photo.paste(self.strip_image)
+        self.app.arena.record_unpooled(strip.nbytes)
+        self.app.instrumentation.lap("blit", mark)
     
     def show_recording_indicator(self):
         if self.recording_indicator is None:
@@ -282,6 +765,155 @@ class DisplayWindow:
             self.canvas.delete(self.recording_indicator)
             self.recording_indicator = None
 
+    def show_hud(self, text):
+        """Show or refresh the performance overlay below the recording indicator."""
+        if self.hud is None:
+            self.hud = self.canvas.create_text(
+                20, 50, anchor="nw", text=text, fill="lime", font=("Courier", 10))
+        else:
+            self.canvas.itemconfig(self.hud, text=text)
+
+    def hide_hud(self):
+        if self.hud is not None:
+            self.canvas.delete(self.hud)
+            self.hud = None
+
+    def show_status(self, text):
+        """Show a message in the middle of the display, such as the camera connection state."""
+        x = self.canvas.winfo_width() // 2
+        y = self.canvas.winfo_height() // 2
+        if self.status_id is None:
+            self.status_id = self.canvas.create_text(x, y, text=text, fill="white", font=("Arial", 16))
+        else:
+            self.canvas.coords(self.status_id, x, y)
+            self.canvas.itemconfig(self.status_id, text=text)
+
+    def hide_status(self):
+        if self.status_id is not None:
+            self.canvas.delete(self.status_id)
+            self.status_id = None
+
+    def show_depth(self, coloured, text):
+        """Show a disparity map centred below the two views, at half the size of one view."""
+        height, width = coloured.shape[:2]
+        size = (max(self.display_size // 2, 1), max(self.display_size * height // (2 * width), 1))
+
+        # Reuse the buffers, the image sharing their memory and the PhotoImage while the size stays the same
+        if self.depth_photo is None or (self.depth_photo.width(), self.depth_photo.height()) != size:
+            self.depth_resized = np.empty((size[1], size[0], 3), np.uint8)
+            self.depth_rgba = np.empty((size[1], size[0], 4), np.uint8)
+            self.depth_image = Image.frombuffer("RGBA", size, self.depth_rgba, "raw", "RGBA", 0, 1)
+            self.depth_photo = ImageTk.PhotoImage("RGBA", size)
+        cv2.resize(coloured, size, dst=self.depth_resized, interpolation=cv2.INTER_NEAREST)
+        cv2.cvtColor(self.depth_resized, cv2.COLOR_BGR2RGBA, dst=self.depth_rgba)
+        self.depth_photo.paste(self.depth_image)
+
+        x = (self.left_x + self.right_x) // 2
+        y = self.canvas.winfo_height() - 10
+        if self.depth_id is None:
+            self.depth_id = self.canvas.create_image(x, y, anchor="s", image=self.depth_photo)
+            self.depth_text = self.canvas.create_text(x, y - size[1] - 5, anchor="s", text=text,
+                                                      fill="white", font=("Courier", 10))
+        else:
+            self.canvas.coords(self.depth_id, x, y)
+            self.canvas.itemconfig(self.depth_id, image=self.depth_photo)
+            self.canvas.coords(self.depth_text, x, y - size[1] - 5)
+            self.canvas.itemconfig(self.depth_text, text=text)
+
+    def hide_depth(self):
+        if self.depth_id is not None:
+            self.canvas.delete(self.depth_id)
+            self.canvas.delete(self.depth_text)
+            self.depth_id = None
+            self.depth_text = None
+
+class LibraryWindow:
+    def __init__(self, app, folder):
+        self.app = app
+        self.folder = folder
+        self.sessions = []
+        self.thumbnail = None
+        self.window = tk.Toplevel(app.root)
+        self.window.title(f"Media Library - {folder}")
+
+        # Session list on the left, thumbnail and details of the selection on the right
+        self.listbox = tk.Listbox(self.window, width=70, height=20, exportselection=False)
+        self.listbox.grid(row=0, column=0, rowspan=3, sticky="nsew", padx=5, pady=5)
+        self.listbox.bind("<<ListboxSelect>>", lambda event: self.show_selection())
+        self.listbox.bind("<Double-Button-1>", lambda event: self.open_selection())
+        self.preview = tk.Label(self.window)
+        self.preview.grid(row=0, column=1, sticky="nsew", padx=5, pady=5)
+        self.details = tk.Label(self.window, justify="left", anchor="nw", wraplength=260)
+        self.details.grid(row=1, column=1, sticky="nsew", padx=5, pady=5)
+        self.open_button = tk.Button(self.window, text="Open", command=self.open_selection)
+        self.open_button.grid(row=2, column=1, sticky="nsew", padx=5, pady=5)
+        self.status = tk.Label(self.window, anchor="w")
+        self.status.grid(row=3, column=0, columnspan=2, sticky="nsew", padx=5)
+        self.window.grid_columnconfigure(0, weight=1)
+        self.window.grid_rowconfigure(0, weight=1)
+
+        # Show what the index already knows at once, then refresh from a background scan
+        self.show_sessions(app.library.sessions(folder))
+        self.status.config(text="Scanning...")
+        self.scan_result = None
+        self.scan_thread = threading.Thread(target=self.scan, name="library-scan", daemon=True)
+        self.scan_thread.start()
+        self.window.after(100, self.poll_scan)
+
+    def scan(self):
+        try:
+            self.scan_result = self.app.library.scan(self.folder)
+        except OSError as error:
+            self.scan_result = error
+
+    def poll_scan(self):
+        if self.scan_thread.is_alive():
+            self.window.after(100, self.poll_scan)
+            return
+        if isinstance(self.scan_result, OSError):
+            self.status.config(text=f"Error: {self.scan_result}")
+            return
+        self.show_sessions(self.scan_result)
+        self.status.config(text=f"{len(self.sessions)} sessions")
+
+    def show_sessions(self, sessions):
+        selected = self.selected()
+        self.sessions = sessions
+        self.listbox.delete(0, tk.END)
+        from library import describe
+        for index, session in enumerate(sessions):
+            self.listbox.insert(tk.END, describe(session))
+            if selected is not None and session["name"] == selected["name"]:
+                self.listbox.selection_set(index)
+        self.show_selection()
+
+    def selected(self):
+        selection = self.listbox.curselection()
+        return self.sessions[selection[0]] if selection else None
+
+    def show_selection(self):
+        session = self.selected()
+        if session is None:
+            self.preview.config(image="")
+            self.details.config(text="")
+            return
+        from library import describe
+        self.thumbnail = None
+        if session["thumbnail"] and os.path.exists(session["thumbnail"]):
+            self.thumbnail = ImageTk.PhotoImage(Image.open(session["thumbnail"]))
+        self.preview.config(image=self.thumbnail or "")
+        paths = [session[key] for key in ("path", "left", "right") if key in session]
+        self.details.config(text=f"{describe(session)}\n{session['frames']} frames\n" +
+                                 "\n".join(os.path.basename(path) for path in paths))
+
+    def open_selection(self):
+        session = self.selected()
+        if session is None:
+            return
+        self.window.destroy()
+        self.app.open_session(session)
+
+
 class ControlPanel:
     def __init__(self, app):
         self.app = app
@@ -335,14 +967,103 @@ class ControlPanel:
         # Checkerboard Calibration
         self.checkerboard_frame = tk.LabelFrame(self.calibration_frame, text="Checkerboard Calibration")
         self.checkerboard_frame.grid(row=0, column=0, sticky="nsew", padx=5, pady=5)
+        self.init_checkerboard_calibration()
         
         # Lens Shading Calibration
         self.lens_shading_frame = tk.LabelFrame(self.calibration_frame, text="Lens Shading Calibration")
         self.lens_shading_frame.grid(row=0, column=1, sticky="nsew", padx=5, pady=5)
+        self.init_lens_shading_calibration()
         
         # Color Chart Analysis
         self.color_analysis_frame = tk.LabelFrame(self.calibration_frame, text="Color Chart Analysis")
         self.color_analysis_frame.grid(row=0, column=2, sticky="nsew", padx=5, pady=5)
+        self.init_color_analysis()
+
+    def init_checkerboard_calibration(self):
+        self.checkerboard_frame.grid_columnconfigure(0, weight=1)
+        self.checkerboard_frame.grid_columnconfigure(1, weight=1)
+
+        # Collect pairs and solve
+        self.add_pair_button = tk.Button(self.checkerboard_frame, text="Add Pair", command=self.app.add_calibration_pair)
+        self.add_pair_button.grid(row=0, column=0, padx=2, pady=2, sticky="nsew")
+        self.calibrate_button = tk.Button(self.checkerboard_frame, text="Calibrate", command=self.app.run_calibration)
+        self.calibrate_button.grid(row=0, column=1, padx=2, pady=2, sticky="nsew")
+
+        # Persist the calibration
+        self.save_calibration_button = tk.Button(self.checkerboard_frame, text="Save", command=self.app.save_calibration)
+        self.save_calibration_button.grid(row=1, column=0, padx=2, pady=2, sticky="nsew")
+        self.load_calibration_button = tk.Button(self.checkerboard_frame, text="Load", command=self.app.load_calibration)
+        self.load_calibration_button.grid(row=1, column=1, padx=2, pady=2, sticky="nsew")
+
+        # Apply rectification to live and playback frames
+        self.rectify_var = tk.BooleanVar(value=False)
+        self.rectify_check = tk.Checkbutton(self.checkerboard_frame, text="Rectify", variable=self.rectify_var,
+                                            command=lambda: self.app.set_rectify(self.rectify_var.get()))
+        self.rectify_check.grid(row=2, column=0, sticky="w")
+
+        # Disparity overlay, most useful with rectification on
+        self.depth_var = tk.BooleanVar(value=False)
+        self.depth_check = tk.Checkbutton(self.checkerboard_frame, text="Depth", variable=self.depth_var,
+                                          command=lambda: self.app.set_depth(self.depth_var.get()))
+        self.depth_check.grid(row=2, column=1, sticky="w")
+
+        self.calibration_status = tk.Label(self.checkerboard_frame, text="Pairs: 0", justify="left", anchor="w")
+        self.calibration_status.grid(row=3, column=0, columnspan=2, sticky="nsew")
+
+    def update_calibration_status(self, text):
+        self.calibration_status.config(text=text)
+
+    def init_lens_shading_calibration(self):
+        self.lens_shading_frame.grid_columnconfigure(0, weight=1)
+        self.lens_shading_frame.grid_columnconfigure(1, weight=1)
+
+        # Average frames of a uniformly lit target, then derive gain maps
+        self.flat_field_button = tk.Button(self.lens_shading_frame, text="Collect", command=self.app.toggle_flat_field)
+        self.flat_field_button.grid(row=0, column=0, padx=2, pady=2, sticky="nsew")
+        self.compute_shading_button = tk.Button(self.lens_shading_frame, text="Compute", command=self.app.compute_shading)
+        self.compute_shading_button.grid(row=0, column=1, padx=2, pady=2, sticky="nsew")
+
+        # Persist the correction
+        self.save_shading_button = tk.Button(self.lens_shading_frame, text="Save", command=self.app.save_shading)
+        self.save_shading_button.grid(row=1, column=0, padx=2, pady=2, sticky="nsew")
+        self.load_shading_button = tk.Button(self.lens_shading_frame, text="Load", command=self.app.load_shading)
+        self.load_shading_button.grid(row=1, column=1, padx=2, pady=2, sticky="nsew")
+
+        # Apply the correction to live and playback frames
+        self.shading_var = tk.BooleanVar(value=False)
+        self.shading_check = tk.Checkbutton(self.lens_shading_frame, text="Correct", variable=self.shading_var,
+                                            command=lambda: self.app.set_shading(self.shading_var.get()))
+        self.shading_check.grid(row=2, column=0, columnspan=2, sticky="w")
+
+        self.shading_status = tk.Label(self.lens_shading_frame, text="Frames: 0", justify="left", anchor="w")
+        self.shading_status.grid(row=3, column=0, columnspan=2, sticky="nsew")
+
+    def init_color_analysis(self):
+        self.color_analysis_frame.grid_columnconfigure(0, weight=1)
+        self.color_analysis_frame.grid_columnconfigure(1, weight=1)
+
+        # Fit both eyes to a ColorChecker held in view
+        self.fit_color_button = tk.Button(self.color_analysis_frame, text="Fit Chart", command=self.app.fit_color_chart)
+        self.fit_color_button.grid(row=0, column=0, padx=2, pady=2, sticky="nsew")
+        self.reset_color_button = tk.Button(self.color_analysis_frame, text="Reset", command=self.app.reset_color_correction)
+        self.reset_color_button.grid(row=0, column=1, padx=2, pady=2, sticky="nsew")
+
+        # Apply the correction to live and playback frames
+        self.color_var = tk.BooleanVar(value=False)
+        self.color_check = tk.Checkbutton(self.color_analysis_frame, text="Correct", variable=self.color_var,
+                                          command=lambda: self.app.set_color_correction(self.color_var.get()))
+        self.color_check.grid(row=1, column=0, columnspan=2, sticky="w")
+
+        self.color_status = tk.Label(self.color_analysis_frame, text="No correction", justify="left",
+                                     anchor="w", wraplength=180)
+        self.color_status.grid(row=2, column=0, columnspan=2, sticky="nsew")
+
+    def update_color_status(self, text):
+        self.color_status.config(text=text)
+
+    def update_shading_status(self, collecting, frames):
+        self.flat_field_button.config(text="Stop" if collecting else "Collect")
+        self.shading_status.config(text=f"Frames: {frames}" + (" (collecting)" if collecting else ""))
 
     def init_camera_controls(self):
         # Create sliders for left 
@@ -360,7 +1081,7 @@ class ControlPanel:
             self.left_camera_frame, "Focus", 0, 255, 1, 128, 
             3, 0, self.update_left_camera_setting)
         self.left_denoising = self.create_slider(
-            self.left_camera_frame, "Denoising Strength", 0, 1, 0.05, 0.5, 
+            self.left_camera_frame, "Denoising Strength", 0, 1, 0.05, 0, 
             4, 0, self.update_left_camera_setting)
 
         # Create sliders for right camera
@@ -378,7 +1099,7 @@ class ControlPanel:
             self.right_camera_frame, "Focus", 0, 255, 1, 128, 
             3, 0, self.update_right_camera_setting)
         self.right_denoising = self.create_slider(
-            self.right_camera_frame, "Denoising Strength", 0, 1, 0.05, 0.5, 
+            self.right_camera_frame, "Denoising Strength", 0, 1, 0.05, 0, 
             4, 0, self.update_right_camera_setting)
         
     def init_save_load(self):
@@ -408,6 +1129,31 @@ class ControlPanel:
         self.preview_button = tk.Button(self.save_load_frame, text="Preview", command=self.start_preview)
         self.preview_button.grid(row=0, column=4, padx=5, pady=5, sticky="nsew")
 
+        # Save the last seconds before now
+        self.replay_button = tk.Button(self.save_load_frame, text="Save Replay", command=self.app.save_replay)
+        self.replay_button.grid(row=1, column=0, padx=5, pady=5, sticky="nsew")
+
+        # Recording format
+        self.format_label = tk.Label(self.save_load_frame, text="Format", anchor="e")
+        self.format_label.grid(row=1, column=1, padx=5, pady=5, sticky="nsew")
+        self.format_var = tk.StringVar(value="AVI")
+        self.format_menu = tk.OptionMenu(self.save_load_frame, self.format_var, *RECORDING_FORMATS,
+                                         command=self.app.set_recording_format)
+        self.format_menu.grid(row=1, column=2, columnspan=2, padx=5, pady=5, sticky="nsew")
+
+        # Save every frame for a few seconds
+        self.burst_button = tk.Button(self.save_load_frame, text="Burst", command=self.app.capture_burst)
+        self.burst_button.grid(row=1, column=4, padx=5, pady=5, sticky="nsew")
+
+        # Folder for everything saved this session
+        self.folder_button = tk.Button(self.save_load_frame, text="Folder", command=self.app.choose_session_folder)
+        self.folder_button.grid(row=2, column=0, padx=5, pady=5, sticky="nsew")
+        self.folder_label = tk.Label(self.save_load_frame, text="Not chosen", anchor="w")
+        self.folder_label.grid(row=2, column=1, columnspan=4, padx=5, pady=5, sticky="nsew")
+
+    def update_folder_label(self, folder):
+        self.folder_label.config(text=folder)
+
     def init_display_settings(self):
         self.display_settings_frame.grid_columnconfigure(0, weight=1)
         self.display_settings_frame.grid_columnconfigure(1, weight=1)
@@ -432,9 +1178,8 @@ class ControlPanel:
         # Place the slider in the specified grid
         slider.grid(row=row, column=col, sticky="nsew", padx=1, pady=1)
         
-        # Bind the slider movement to update the display settings in CameraApp
-        slider.bind("<Motion>", lambda event: callback())
-        slider.bind("<ButtonRelease-1>", lambda event: callback())
+        # Notify CameraApp only when the value actually changes, not on every mouse movement
+        slider.config(command=lambda value: callback())
         
         return slider
 
@@ -442,9 +1187,7 @@ class ControlPanel:
         self.app.save_image()
 
     def start_recording(self):
-        self.app.recording = True
-        self.app.recorded_frames = []
-        self.app.display_window.show_recording_indicator()
+        self.app.start_recording()
         self.update_button_states()
 
     def save_recording(self):
@@ -456,7 +1199,7 @@ class ControlPanel:
         self.update_button_states()
 
     def start_preview(self):
-        self.app.preview = True
+        self.app.start_preview()
         self.update_button_states()
     
     def update_button_states(self):
@@ -464,19 +1207,24 @@ class ControlPanel:
         if self.app.preview:
             if self.app.recording:
                 self.capture_button.config(state="disabled")
+                self.burst_button.config(state="disabled")
                 self.record_button.config(state="disabled")
                 self.load_button.config(state="disabled")
                 self.preview_button.config(state="disabled")
                 self.save_recording_button.config(state="normal")
             else:
                 self.capture_button.config(state="normal")
+                self.burst_button.config(state="normal")
                 self.record_button.config(state="normal")
                 self.load_button.config(state="normal")
                 self.preview_button.config(state="disabled")
                 self.save_recording_button.config(state="disabled")
+            self.replay_button.config(state="normal")
         else:
             # Playback or loaded media mode
             self.capture_button.config(state="disabled")
+            self.burst_button.config(state="disabled")
+            self.replay_button.config(state="disabled")
             self.record_button.config(state="disabled")
             self.load_button.config(state="disabled")
             self.preview_button.config(state="normal")
@@ -512,6 +1260,29 @@ class ControlPanel:
         self.app.update_right_camera(exposure, gain, white_balance, focus, denoising)
 
 # Main execution
-root = tk.Tk()
-app = CameraApp(root)
-app.run()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stereo endoscope camera GUI")
+    parser.add_argument("--source", choices=BACKENDS, help="frame source backend, uvc by default")
+    parser.add_argument("--source-config", help="JSON file with the backend and its options")
+    parser.add_argument("--stream-port", type=int, help="serve the live view as MJPEG on this port")
+    parser.add_argument("--stream-host", default="127.0.0.1", help="address to stream on, 0.0.0.0 for the network")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print startup timings as JSON once the first frame is shown, then exit")
+    args = parser.parse_args(argv)
+
+    source_config = {}
+    if args.source_config:
+        with open(args.source_config) as file:
+            source_config = json.load(file)
+    if args.source:
+        source_config["backend"] = args.source
+
+    root = tk.Tk()
+    stream_address = (args.stream_host, args.stream_port) if args.stream_port else None
+    app = CameraApp(root, source_config, stream_address)
+    app.startup_report = args.startup_report
+    app.run()
+
+
+if __name__ == "__main__":
+    main()
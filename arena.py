@@ -0,0 +1,84 @@
+import threading
+import numpy as np
+
+
+class FrameArena:
+    """Pool of reusable frame buffers keyed by shape and type, handed out and returned by pipeline stages."""
+
+    def __init__(self, max_free=16):
+        self.max_free = max_free     # spare buffers kept per shape; extras are left to the garbage collector
+        self.free = {}
+        self.lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.allocated_bytes = 0
+        self.outstanding = 0
+        self.steady_misses = None    # misses at the point the pipeline was declared warmed up
+        self.unpooled = 0            # known per-frame allocations made outside the pool, e.g. by Pillow
+        self.unpooled_bytes = 0
+        self.steady_unpooled = None
+
+    def acquire(self, shape, dtype=np.uint8):
+        """Hand out a buffer of the given layout, allocating only if none is free."""
+        key = (tuple(shape), np.dtype(dtype))
+        with self.lock:
+            self.outstanding += 1
+            spares = self.free.get(key)
+            if spares:
+                self.hits += 1
+                return spares.pop()
+            self.misses += 1
+        buffer = np.empty(key[0], key[1])
+        with self.lock:
+            self.allocated_bytes += buffer.nbytes
+        return buffer
+
+    def acquire_like(self, frame):
+        return self.acquire(frame.shape, frame.dtype)
+
+    def release(self, buffer):
+        """Return a buffer handed out by acquire; it must not be used afterwards."""
+        key = (buffer.shape, buffer.dtype)
+        with self.lock:
+            self.outstanding -= 1
+            spares = self.free.setdefault(key, [])
+            if len(spares) < self.max_free:
+                spares.append(buffer)
+
+    def release_pair(self, pair):
+        if pair is not None:
+            self.release(pair[0])
+            self.release(pair[1])
+
+    def record_unpooled(self, nbytes):
+        """Count an allocation the hot loop cannot take from the pool, so it is not hidden."""
+        with self.lock:
+            self.unpooled += 1
+            self.unpooled_bytes += nbytes
+
+    def mark_steady(self):
+        """Declare warm-up over; any later miss means the hot loop is still allocating."""
+        self.steady_misses = self.misses
+        self.steady_unpooled = self.unpooled
+
+    def steady_state_misses(self):
+        return 0 if self.steady_misses is None else self.misses - self.steady_misses
+
+    def steady_state_unpooled(self):
+        return 0 if self.steady_unpooled is None else self.unpooled - self.steady_unpooled
+
+    def stats(self):
+        with self.lock:
+            spare_bytes = sum(buffer.nbytes for spares in self.free.values() for buffer in spares)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "steady_state_misses": self.steady_state_misses(),
+            "steady_state_unpooled": self.steady_state_unpooled(),
+            "unpooled_mb": self.unpooled_bytes / (1024 * 1024),
+            "outstanding": self.outstanding,
+            "allocated_mb": self.allocated_bytes / (1024 * 1024),
+            "spare_mb": spare_bytes / (1024 * 1024),
+        }
@@ -0,0 +1,250 @@
+"""Headless benchmark of the capture, render, record and playback paths using a synthetic camera.
+
+Example:
+    python benchmark.py --resolutions 1280x480,2560x720 --display-sizes 320,640 --seconds 5
+    python benchmark.py --startup 5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+from PIL import Image
+from arena import FrameArena
+from capture import FrameRing, CaptureThread
+from recorder import StreamingRecorder
+from playback import PlaybackEngine
+from render import RenderEngine
+from instrumentation import Instrumentation
+from sources import SyntheticStereoSource
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process so far, where the platform reports it."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 if os.uname().sysname != "Darwin" else peak / (1024 * 1024)
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    return None
+
+
+def render_engine_for(display_size):
+    """Render engine laid out so each eye is exactly display_size pixels wide."""
+    engine = RenderEngine()
+    engine.set_geometry(display_size * 4, display_size * 2, 0.25, 0.5, 0.0)
+    return engine
+
+
+def run_live(width, height, display_size, seconds, fps, folder, jitter=0.0, drop_rate=0.0):
+    """Capture, render and record for a fixed time, as the live preview does."""
+    camera = SyntheticStereoSource(width, height, fps=fps, jitter=jitter, drop_rate=drop_rate)
+    instrumentation = Instrumentation(enabled=True)
+    arena = FrameArena()
+    ring = FrameRing(slots=8)
+    capture = CaptureThread(camera, ring, instrumentation=instrumentation)
+    reader = ring.reader("display")
+    engine = render_engine_for(display_size)
+    height, width = engine.strip.shape[:2]
+    strip_image = Image.frombuffer("RGBA", (width, height), engine.strip, "raw", "RGBA", 0, 1)
+    recorder = StreamingRecorder(folder, fps or 30.0, instrumentation=instrumentation, arena=arena)
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    capture.start()
+    recorder.start(ring.reader("recorder"))
+
+    displayed = 0
+    display_pair = None
+    while time.perf_counter() - start < seconds:
+        if not reader.wait(timeout=0.1):
+            continue
+        if arena.steady_misses is None and time.perf_counter() - start > min(1.0, seconds / 2):
+            arena.mark_steady()
+        mark = instrumentation.mark()
+        latest = reader.latest(arena=arena)
+        if latest is None:
+            continue
+        left_frame, right_frame, timestamp, seq = latest
+        arena.release_pair(display_pair)
+        display_pair = (left_frame, right_frame)
+        instrumentation.begin_frame()
+        mark = instrumentation.lap("ring_read", mark)
+        engine.compose(left_frame, right_frame)
+        mark = instrumentation.lap("render", mark)
+
+        # Stand-in for the PhotoImage paste, which copies the strip into a newly allocated Pillow block
+        strip_image.copy()
+        arena.record_unpooled(engine.strip.nbytes)
+        instrumentation.lap("blit", mark)
+        instrumentation.record("capture_to_display", (time.perf_counter() - timestamp) * 1000, in_frame=True)
+        instrumentation.end_frame()
+        displayed += 1
+
+    capture.stop()
+    stop_start = time.perf_counter()
+    recorder.stop()
+    stop_ms = (time.perf_counter() - stop_start) * 1000
+    recorder.wait()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    stages = instrumentation.summary()["stages"]
+    return {
+        "captured_fps": capture.frames_captured / elapsed,
+        "displayed_fps": displayed / elapsed,
+        "display_dropped": reader.dropped,
+        "recorded_frames": recorder.stats()["left_written"],
+        "recorder_dropped": recorder.stats()["dropped"],
+        "recorder_stop_ms": stop_ms,
+        "cpu_percent": 100 * cpu / elapsed,
+        "stages": stages,
+        "pool": arena.stats(),
+        "segments": recorder.segments,
+    }
+
+
+def run_playback(left_path, right_path, display_size, max_frames=300):
+    """Decode and render a recorded pair as fast as possible."""
+    instrumentation = Instrumentation(enabled=True)
+    engine = render_engine_for(display_size)
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    playback = PlaybackEngine(left_path, right_path)
+    first_frame_ms = None
+    frames = 0
+    while frames < max_frames:
+        mark = instrumentation.mark()
+        left_frame, right_frame = playback.next_frame()
+        mark = instrumentation.lap("decode", mark)
+        if first_frame_ms is None:
+            first_frame_ms = (time.perf_counter() - start) * 1000
+        engine.compose(left_frame, right_frame)
+        instrumentation.lap("render", mark)
+        frames += 1
+        if playback.frame_count and frames >= playback.frame_count:
+            break
+    playback.release()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "first_frame_ms": first_frame_ms,
+        "playback_fps": frames / elapsed,
+        "cpu_percent": 100 * (time.process_time() - cpu_start) / elapsed,
+        "stages": instrumentation.summary()["stages"],
+    }
+
+
+def run_matrix(resolutions, display_sizes, seconds, fps, jitter=0.0, drop_rate=0.0):
+    results = []
+    for width, height in resolutions:
+        for display_size in display_sizes:
+            with tempfile.TemporaryDirectory() as folder:
+                live = run_live(width, height, display_size, seconds, fps, folder, jitter, drop_rate)
+                left_path, right_path = live.pop("segments")[0]
+                playback = run_playback(left_path, right_path, display_size)
+            results.append({
+                "resolution": f"{width}x{height}",
+                "display_size": display_size,
+                "live": live,
+                "playback": playback,
+                "peak_memory_mb": peak_memory_mb(),
+            })
+            print_result(results[-1])
+    return results
+
+
+def run_startup(runs, source="synthetic", timeout=60.0):
+    """Launch the GUI repeatedly in fresh processes and collect its startup milestones, in seconds."""
+    folder = os.path.dirname(os.path.abspath(__file__))
+    import_code = "import time; start = time.perf_counter(); import GUI; print(time.perf_counter() - start)"
+    samples = {"import": []}
+    for _ in range(runs):
+        # Importing the module alone must not open any window or device
+        output = subprocess.run([sys.executable, "-c", import_code], cwd=folder, capture_output=True,
+                                text=True, timeout=timeout, check=True).stdout
+        samples["import"].append(float(output.split()[-1]))
+
+        process = subprocess.run([sys.executable, os.path.join(folder, "GUI.py"), "--source", source,
+                                  "--startup-report"], cwd=folder, capture_output=True, text=True, timeout=timeout)
+        lines = [line for line in process.stdout.splitlines() if line.startswith("Startup:")]
+        if not lines:
+            print(f"Error: The GUI did not report its startup:\n{process.stdout}{process.stderr}")
+            continue
+        for milestone, seconds in json.loads(lines[-1][len("Startup:"):]).items():
+            samples.setdefault(milestone, []).append(seconds)
+
+    result = {milestone: {"median": statistics.median(values), "max": max(values)}
+              for milestone, values in samples.items()}
+    print(f"startup over {runs} runs from process start: " + ", ".join(
+        f"{milestone} {stats['median'] * 1000:.0f} ms (max {stats['max'] * 1000:.0f})"
+        for milestone, stats in result.items()))
+    return result
+
+
+def p95(stages, name):
+    return stages[name]["p95"] if stages.get(name) else float("nan")
+
+
+def print_result(result):
+    live = result["live"]
+    playback = result["playback"]
+    print(f"{result['resolution']:>10} -> {result['display_size']:>4}px | "
+          f"capture {live['captured_fps']:6.1f} fps, display {live['displayed_fps']:6.1f} fps, "
+          f"render p95 {p95(live['stages'], 'render'):5.2f} ms, "
+          f"latency p95 {p95(live['stages'], 'capture_to_display'):6.2f} ms, "
+          f"cpu {live['cpu_percent']:5.1f}%, pool misses {live['pool']['steady_state_misses']}, "
+          f"unpooled {live['pool']['steady_state_unpooled']} | "
+          f"playback {playback['playback_fps']:6.1f} fps, first frame {playback['first_frame_ms']:6.1f} ms | "
+          f"peak {result['peak_memory_mb'] or float('nan'):6.0f} MB")
+
+
+def parse_resolutions(text):
+    return [tuple(int(value) for value in item.split("x")) for item in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", default="1280x480,2560x720,3840x1080",
+                        help="side-by-side camera frame sizes, WIDTHxHEIGHT, comma separated")
+    parser.add_argument("--display-sizes", default="320,640",
+                        help="displayed size of each eye in pixels, comma separated")
+    parser.add_argument("--seconds", type=float, default=3.0, help="duration of each live run")
+    parser.add_argument("--fps", type=float, default=60.0, help="synthetic camera rate, 0 for unpaced")
+    parser.add_argument("--jitter", type=float, default=0.0, help="frame arrival jitter in seconds")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="probability of a failed read")
+    parser.add_argument("--startup", type=int, metavar="RUNS",
+                        help="measure time to first window and first frame of the GUI instead")
+    parser.add_argument("--startup-source", default="synthetic", help="camera backend for the startup runs")
+    parser.add_argument("--json", help="write the full results to this file")
+    args = parser.parse_args()
+
+    if args.startup:
+        results = run_startup(args.startup, args.startup_source)
+    else:
+        results = run_matrix(parse_resolutions(args.resolutions),
+                             [int(size) for size in args.display_sizes.split(",")],
+                             args.seconds, args.fps, args.jitter, args.drop_rate)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Saved benchmark results: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
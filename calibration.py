@@ -0,0 +1,214 @@
+import cv2
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+def find_corners(left_gray, right_gray, pattern_size):
+    """Detect checkerboard corners in both eyes; returns (left, right) or None if either misses."""
+    flags = cv2.CALIB_CB_ADAPTIVE_THRESH | cv2.CALIB_CB_NORMALIZE_IMAGE | cv2.CALIB_CB_FAST_CHECK
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+    corners = []
+    for gray in (left_gray, right_gray):
+        found, points = cv2.findChessboardCorners(gray, pattern_size, flags=flags)
+        if not found:
+            return None
+        corners.append(cv2.cornerSubPix(gray, points, (11, 11), (-1, -1), criteria))
+    return corners[0], corners[1]
+
+
+def solve_stereo(object_points, left_points, right_points, image_size):
+    """Calibrate each eye, then the pair, then compute the rectifying transforms."""
+    _, K1, D1, _, _ = cv2.calibrateCamera(object_points, left_points, image_size, None, None)
+    _, K2, D2, _, _ = cv2.calibrateCamera(object_points, right_points, image_size, None, None)
+
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 100, 1e-5)
+    rms, K1, D1, K2, D2, R, T, _, _ = cv2.stereoCalibrate(
+        object_points, left_points, right_points, K1, D1, K2, D2, image_size,
+        criteria=criteria, flags=cv2.CALIB_FIX_INTRINSIC)
+
+    # alpha=0 crops to valid pixels so the rectified views keep the square size of the split
+    R1, R2, P1, P2, Q, _, _ = cv2.stereoRectify(
+        K1, D1, K2, D2, image_size, R, T, flags=cv2.CALIB_ZERO_DISPARITY, alpha=0)
+    return StereoCalibration(image_size, K1, D1, K2, D2, R, T, R1, R2, P1, P2, Q, rms)
+
+
+class StereoCalibration:
+    """Intrinsics, extrinsics and rectifying transforms of a calibrated stereo pair."""
+
+    FIELDS = ("K1", "D1", "K2", "D2", "R", "T", "R1", "R2", "P1", "P2", "Q")
+
+    def __init__(self, image_size, K1, D1, K2, D2, R, T, R1, R2, P1, P2, Q, rms):
+        self.image_size = tuple(int(value) for value in image_size)   # (width, height) of one eye
+        self.K1, self.D1, self.K2, self.D2 = K1, D1, K2, D2
+        self.R, self.T = R, T
+        self.R1, self.R2, self.P1, self.P2, self.Q = R1, R2, P1, P2, Q
+        self.rms = float(rms)
+
+    def save(self, path):
+        matrices = {field: getattr(self, field) for field in self.FIELDS}
+        np.savez(path, image_size=np.array(self.image_size), rms=np.array(self.rms), **matrices)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            matrices = {field: data[field] for field in cls.FIELDS}
+            return cls(tuple(data["image_size"]), rms=float(data["rms"]), **matrices)
+
+
+class Rectifier:
+    """Undistorts and rectifies stereo pairs with remap tables computed once per calibration."""
+
+    def __init__(self, calibration):
+        self.calibration = calibration
+        self.image_size = calibration.image_size
+
+        # Fixed-point maps make each remap a single cheap lookup per pixel
+        self.left_maps = cv2.initUndistortRectifyMap(
+            calibration.K1, calibration.D1, calibration.R1, calibration.P1, self.image_size, cv2.CV_16SC2)
+        self.right_maps = cv2.initUndistortRectifyMap(
+            calibration.K2, calibration.D2, calibration.R2, calibration.P2, self.image_size, cv2.CV_16SC2)
+        self.left_out = None
+        self.right_out = None
+        self.warned = False
+
+    def rectify(self, left_frame, right_frame):
+        """Return the rectified pair, written into buffers reused across frames."""
+        if (left_frame.shape[1], left_frame.shape[0]) != self.image_size:
+            if not self.warned:
+                print(f"Warning: Calibration is for {self.image_size} views, skipping rectification.")
+                self.warned = True
+            return left_frame, right_frame
+
+        self.left_out = cv2.remap(left_frame, *self.left_maps, cv2.INTER_LINEAR, dst=self.left_out)
+        self.right_out = cv2.remap(right_frame, *self.right_maps, cv2.INTER_LINEAR, dst=self.right_out)
+        return self.left_out, self.right_out
+
+
+class StereoCalibrator:
+    """Collects checkerboard pairs, detecting corners in a process pool so the UI stays responsive."""
+
+    def __init__(self, pattern_size=(9, 6), square_size=25.0, min_pairs=8, workers=2):
+        self.pattern_size = pattern_size      # inner corners per row and column
+        self.square_size = square_size        # in millimetres
+        self.min_pairs = min_pairs
+        self.workers = workers
+        self.executor = None
+        self.pending = []
+        self.solve_future = None
+        self.calibration = None
+        self.worker_failures = 0
+        self.reset()
+
+    def reset(self):
+        for future in self.pending:
+            future.cancel()
+        self.pending = []
+        self.left_points = []
+        self.right_points = []
+        self.image_size = None
+        self.pairs_rejected = 0
+
+    def add_pair(self, left_frame, right_frame):
+        """Queue corner detection on a stereo pair; returns False if its size does not match."""
+        image_size = (left_frame.shape[1], left_frame.shape[0])
+        if self.image_size is None:
+            self.image_size = image_size
+        elif image_size != self.image_size:
+            print("Error: Calibration pairs must all have the same size.")
+            return False
+
+        left_gray = cv2.cvtColor(left_frame, cv2.COLOR_BGR2GRAY)
+        right_gray = cv2.cvtColor(right_frame, cv2.COLOR_BGR2GRAY)
+        self.pending.append(self.submit(find_corners, left_gray, right_gray, self.pattern_size))
+        return True
+
+    def submit(self, function, *args):
+        """Run a job in the pool, starting a fresh pool if there is none or the last one broke."""
+        for attempt in range(2):
+            if self.executor is None:
+                # Spawn rather than fork: forking while capture and Tk threads hold locks can deadlock the child
+                self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                    mp_context=multiprocessing.get_context("spawn"))
+            try:
+                return self.executor.submit(function, *args)
+            except BrokenProcessPool:
+                if attempt:
+                    raise
+                self.drop_pool()
+
+    def object_points(self):
+        columns, rows = self.pattern_size
+        points = np.zeros((columns * rows, 3), np.float32)
+        points[:, :2] = np.mgrid[0:columns, 0:rows].T.reshape(-1, 2) * self.square_size
+        return points
+
+    def calibrate(self):
+        """Start solving in the pool once enough pairs have been found; returns False if too few."""
+        if len(self.left_points) < self.min_pairs:
+            print(f"Error: Need at least {self.min_pairs} checkerboard pairs, have {len(self.left_points)}.")
+            return False
+        object_points = [self.object_points()] * len(self.left_points)
+        self.solve_future = self.submit(solve_stereo, object_points, self.left_points, self.right_points,
+                                        self.image_size)
+        return True
+
+    def poll(self):
+        """Collect finished work; returns True while detections or the solve are still running."""
+        still_pending = []
+        lost = 0
+        for future in self.pending:
+            if not future.done():
+                still_pending.append(future)
+            elif not future.cancelled():
+                try:
+                    corners = future.result()
+                except BrokenProcessPool:
+                    lost += 1
+                    continue
+                if corners is None:
+                    self.pairs_rejected += 1
+                else:
+                    self.left_points.append(corners[0])
+                    self.right_points.append(corners[1])
+        self.pending = still_pending
+        if lost:
+            print(f"Error: Calibration worker process stopped unexpectedly; {lost} pairs were lost.")
+            self.drop_pool()
+
+        if self.solve_future is not None and self.solve_future.done():
+            try:
+                self.calibration = self.solve_future.result()
+                print(f"Stereo calibration finished, RMS reprojection error {self.calibration.rms:.3f} px")
+            except cv2.error as error:
+                print(f"Error: Stereo calibration failed: {error}")
+            except BrokenProcessPool:
+                print("Error: Calibration worker process stopped unexpectedly while solving.")
+                self.drop_pool()
+            self.solve_future = None
+
+        return bool(self.pending) or self.solve_future is not None
+
+    def status(self):
+        text = f"Pairs: {len(self.left_points)} found, {self.pairs_rejected} rejected"
+        if self.pending:
+            text += f", {len(self.pending)} detecting"
+        if self.solve_future is not None:
+            text += "\nSolving..."
+        elif self.calibration is not None:
+            text += f"\nRMS error: {self.calibration.rms:.3f} px"
+        if self.worker_failures:
+            text += f"\nWorkers restarted {self.worker_failures}x"
+        return text
+
+    def drop_pool(self):
+        """Forget a broken pool so the next job starts a fresh one."""
+        if self.executor is not None:
+            self.worker_failures += 1
+            self.shutdown()
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
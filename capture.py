@@ -0,0 +1,242 @@
+import threading
+import time
+import numpy as np
+
+
+class FrameRing:
+    """Small ring of preallocated stereo pair slots filled by one producer, where the latest pair wins."""
+
+    def __init__(self, slots=8):
+        self.slots = slots
+        self.buffers = [None] * slots    # (left, right) arrays per slot
+        self.timestamps = [0.0] * slots
+        self.sequence = [-1] * slots     # -1 marks a slot that is empty or being written
+        self.consumed = [False] * slots
+        self.lock = threading.Lock()
+        self.new_frame = threading.Condition(self.lock)
+
+        # Counters
+        self.write_seq = 0               # sequence number of the next pair to be written
+        self.overwritten = 0             # pairs overwritten before any reader saw them
+
+    def write(self, left_frame, right_frame, timestamp):
+        """Copy a stereo pair into the next slot and publish it to readers."""
+        index = self.write_seq % self.slots
+
+        # Invalidate the slot first so readers never see a half-written pair
+        with self.lock:
+            if self.sequence[index] >= 0 and not self.consumed[index]:
+                self.overwritten += 1
+            self.sequence[index] = -1
+
+        buffers = self.buffers[index]
+        if buffers is None or not same_layout(buffers, (left_frame, right_frame)):
+            buffers = (np.empty_like(left_frame), np.empty_like(right_frame))
+            self.buffers[index] = buffers
+        np.copyto(buffers[0], left_frame)
+        np.copyto(buffers[1], right_frame)
+
+        with self.new_frame:
+            self.sequence[index] = self.write_seq
+            self.timestamps[index] = timestamp
+            self.consumed[index] = False
+            self.write_seq += 1
+            self.new_frame.notify_all()
+
+    def reader(self, name):
+        """Create an independent consumer cursor starting at the next pair."""
+        return RingReader(self, name)
+
+    def copy_slot(self, seq, out=None, arena=None):
+        """Copy the pair with the given sequence number, or return None if it was overwritten.
+
+        The copy goes into out if it fits, else into buffers taken from the arena if one is given.
+        """
+        if seq < 0:
+            return None      # -1 also marks empty slots, so it must never match one
+        index = seq % self.slots
+        with self.lock:
+            if self.sequence[index] != seq:
+                return None
+            buffers = self.buffers[index]
+            timestamp = self.timestamps[index]
+
+        # Copy outside the lock, then check the writer did not reuse the slot meanwhile
+        pooled = False
+        if out is None or not same_layout(out, buffers):
+            pooled = arena is not None
+            if pooled:
+                out = (arena.acquire_like(buffers[0]), arena.acquire_like(buffers[1]))
+            else:
+                out = (np.empty_like(buffers[0]), np.empty_like(buffers[1]))
+        np.copyto(out[0], buffers[0])
+        np.copyto(out[1], buffers[1])
+
+        with self.lock:
+            if self.sequence[index] != seq:
+                if pooled:
+                    arena.release_pair(out)
+                return None
+            self.consumed[index] = True
+        return out[0], out[1], timestamp
+
+    def stats(self):
+        return {"written": self.write_seq, "overwritten": self.overwritten}
+
+
+def same_layout(first, second):
+    """True if two (left, right) pairs have matching shapes and types."""
+    return all(a.shape == b.shape and a.dtype == b.dtype for a, b in zip(first, second))
+
+
+class RingReader:
+    """Consumer cursor into a FrameRing with its own position and drop counter."""
+
+    def __init__(self, ring, name):
+        self.ring = ring
+        self.name = name
+        self.last_seq = ring.write_seq - 1
+        self.consumed = 0
+        self.dropped = 0
+
+    def latest(self, out=None, arena=None):
+        """Return (left, right, timestamp, seq) for the newest unseen pair, or None if there is none."""
+        newest = self.ring.write_seq - 1
+        if newest <= self.last_seq:
+            return None
+        copied = self.ring.copy_slot(newest, out, arena)
+        if copied is None:
+            return None
+        left_frame, right_frame, timestamp = copied
+        self.dropped += newest - self.last_seq - 1
+        self.consumed += 1
+        self.last_seq = newest
+        return left_frame, right_frame, timestamp, newest
+
+    def drain(self, arena=None):
+        """Return every unseen pair still held by the ring, oldest first."""
+        newest = self.ring.write_seq - 1
+        oldest = max(self.last_seq + 1, newest - self.ring.slots + 1)
+        pairs = []
+        for seq in range(oldest, newest + 1):
+            copied = self.ring.copy_slot(seq, arena=arena)
+            if copied is not None:
+                pairs.append((copied[0], copied[1], copied[2], seq))
+        if newest > self.last_seq:
+            self.dropped += (newest - self.last_seq) - len(pairs)
+            self.consumed += len(pairs)
+            self.last_seq = newest
+        return pairs
+
+    def skip_to_latest(self):
+        """Forget every pair written so far without counting them as dropped."""
+        self.last_seq = self.ring.write_seq - 1
+
+    def wait(self, timeout=None):
+        """Block until an unseen pair is available; returns False on timeout."""
+        with self.ring.new_frame:
+            return self.ring.new_frame.wait_for(lambda: self.ring.write_seq - 1 > self.last_seq, timeout)
+
+
+class CaptureThread(threading.Thread):
+    """Reads stereo pairs from a frame source continuously into a FrameRing.
+
+    Given open_source instead of a source, the device is opened on this thread, retried until it
+    appears and opened again if it stops delivering frames, with progress in status.
+    """
+
+    def __init__(self, source, ring, retry_delay=0.1, instrumentation=None, open_source=None,
+                 reconnect_after=2.0, reopen_delay=1.0):
+        super().__init__(name="capture", daemon=True)
+        self.source = source
+        self.ring = ring
+        self.retry_delay = retry_delay
+        self.instrumentation = instrumentation
+        self.open_source = open_source          # called with no arguments, returns an opened source
+        self.reconnect_after = reconnect_after  # seconds of failed reads before the device is reopened
+        self.reopen_delay = reopen_delay
+        self.running = False
+        self.wake = threading.Event()           # interrupts waits when stopping
+        self.status = "Connected" if source is not None else "Starting"
+        self.streaming = False                  # True while reads are succeeding
+
+        # Counters
+        self.frames_captured = 0
+        self.failed_reads = 0
+        self.connects = 0
+
+    def start(self):
+        self.running = True
+        super().start()
+
+    def run(self):
+        failing_since = None
+        while self.running:
+            if self.source is None:
+                self._connect()
+                continue
+
+            start = time.perf_counter()
+            try:
+                ret, left_frame, right_frame, timestamp = self.source.read()
+            except RuntimeError as error:
+                # Some backends raise instead of failing the read when the device goes away
+                ret, timestamp = False, time.perf_counter()
+                self.status = f"Camera error: {error}"
+            if self.instrumentation is not None:
+                self.instrumentation.record("device_read", (time.perf_counter() - start) * 1000)
+            if not ret:
+                self.failed_reads += 1
+                self.streaming = False
+                if failing_since is None:
+                    print("Warning: Failed to capture frame.")
+                    failing_since = timestamp
+                    self.status = "Camera not responding"
+
+                # A camera that stops delivering altogether is taken to be unplugged and opened again
+                elif self.open_source is not None and timestamp - failing_since > self.reconnect_after:
+                    print("Warning: Camera lost, reconnecting.")
+                    self.source.release()
+                    self.source = None
+                    failing_since = None
+                    continue
+                self.wake.wait(self.retry_delay)  # retry
+                continue
+
+            failing_since = None
+            if not self.streaming:
+                self.status = f"Connected to {self.source.description or self.source.name}"
+                self.streaming = True
+            self.ring.write(left_frame, right_frame, timestamp)
+            self.frames_captured += 1
+
+    def _connect(self):
+        """Try once to open the source, waiting reopen_delay after a failure."""
+        self.status = "Looking for camera" if not self.connects else "Reconnecting camera"
+        try:
+            source = self.open_source()
+        except (ValueError, TypeError, ImportError) as error:
+            # A bad configuration or a missing backend library will not fix itself by retrying
+            print(f"Error: {error}")
+            self.status = f"Error: {error}"
+            self.running = False
+            return
+        except (IOError, RuntimeError) as error:
+            self.status = f"{error}, retrying"
+            self.wake.wait(self.reopen_delay)
+            return
+
+        if not self.running:
+            source.release()      # stopped while the device was opening
+            return
+        self.source = source
+        self.connects += 1
+        self.status = f"Connected to {source.description or source.name}, waiting for frames"
+        print(f"Camera connected: {source.description or source.name}")
+
+    def stop(self, timeout=1.0):
+        """Stop reading and wait for the thread to exit."""
+        self.running = False
+        self.wake.set()
+        if self.is_alive():
+            self.join(timeout)
@@ -0,0 +1,177 @@
+import cv2
+import numpy as np
+
+# sRGB values of the 24 patches of a ColorChecker Classic, row by row, stored as BGR
+REFERENCE_BGR = np.array([
+    (115, 82, 68), (194, 150, 130), (98, 122, 157), (87, 108, 67), (133, 128, 177), (103, 189, 170),
+    (214, 126, 44), (80, 91, 166), (193, 90, 99), (94, 60, 108), (157, 188, 64), (224, 163, 46),
+    (56, 61, 150), (70, 148, 73), (175, 54, 60), (231, 199, 31), (187, 86, 149), (8, 133, 161),
+    (243, 243, 242), (200, 200, 200), (160, 160, 160), (122, 122, 121), (85, 85, 85), (52, 52, 52),
+], dtype=np.float32)[:, ::-1]
+
+CHART_ROWS = 4
+CHART_COLUMNS = 6
+WHITE_PATCH = 18
+BLACK_PATCH = 23
+MAX_FIT_ERROR = 10.0    # mean residual in 8-bit levels above which a fit is not a chart
+
+
+def srgb_to_linear(values):
+    values = np.asarray(values, dtype=np.float32) / 255.0
+    return np.where(values <= 0.04045, values / 12.92, ((values + 0.055) / 1.055) ** 2.4)
+
+
+def linear_to_srgb(values):
+    values = np.clip(values, 0.0, 1.0)
+    encoded = np.where(values <= 0.0031308, values * 12.92, 1.055 * values ** (1 / 2.4) - 0.055)
+    return np.clip(encoded * 255.0 + 0.5, 0, 255).astype(np.uint8)
+
+
+def find_chart_corners(frame):
+    """Corners of the largest quadrilateral in the frame, or None if there is none."""
+    height, width = frame.shape[:2]
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    edges = cv2.dilate(cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 30, 90), None)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    best = None
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area < 0.1 * width * height or (best is not None and area <= best[0]):
+            continue
+        quad = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        if len(quad) == 4 and cv2.isContourConvex(quad):
+            best = (area, quad.reshape(4, 2).astype(np.float32))
+    if best is None:
+        return None
+    return order_corners(best[1])
+
+
+def order_corners(quad):
+    """Order corners top-left, top-right, bottom-right, bottom-left with the long side on top."""
+    sums = quad.sum(axis=1)
+    diffs = np.diff(quad, axis=1).ravel()
+    ordered = np.array([quad[np.argmin(sums)], quad[np.argmin(diffs)],
+                        quad[np.argmax(sums)], quad[np.argmax(diffs)]], np.float32)
+    if np.linalg.norm(ordered[1] - ordered[0]) < np.linalg.norm(ordered[3] - ordered[0]):
+        ordered = np.roll(ordered, -1, axis=0)   # chart held in portrait
+    return ordered
+
+
+def sample_chart(frame, cell=60):
+    """Mean BGR of each of the 24 patches, in reference order, or None if no chart-like area is found."""
+    corners = find_chart_corners(frame)
+    if corners is None:
+        return None
+    target = np.array([(0, 0), (CHART_COLUMNS * cell, 0),
+                       (CHART_COLUMNS * cell, CHART_ROWS * cell), (0, CHART_ROWS * cell)], np.float32)
+    warped = cv2.warpPerspective(frame, cv2.getPerspectiveTransform(corners, target),
+                                 (CHART_COLUMNS * cell, CHART_ROWS * cell))
+
+    # Average the middle half of every cell to stay clear of the borders between patches
+    inset = cell // 4
+    patches = np.array([
+        cv2.mean(warped[row * cell + inset:(row + 1) * cell - inset,
+                        column * cell + inset:(column + 1) * cell - inset])[:3]
+        for row in range(CHART_ROWS) for column in range(CHART_COLUMNS)], np.float32)
+
+    # A chart upside down has the grey row first
+    if patches[WHITE_PATCH].mean() < patches[BLACK_PATCH].mean():
+        patches = patches[::-1]
+    if patches[WHITE_PATCH].mean() - patches[BLACK_PATCH].mean() < 20:
+        return None
+    return patches
+
+
+def fit_color_matrix(measured, reference=REFERENCE_BGR):
+    """Least-squares affine transform in linear light mapping measured patches onto the reference."""
+    source = np.hstack([srgb_to_linear(measured), np.ones((len(measured), 1), np.float32)])
+    matrix, _, _, _ = np.linalg.lstsq(source, srgb_to_linear(reference), rcond=None)
+    return matrix.astype(np.float32)
+
+
+def apply_color_matrix(matrix, values):
+    linear = srgb_to_linear(values)
+    return linear_to_srgb(linear @ matrix[:3] + matrix[3])
+
+
+def build_lut(matrix, bits=7):
+    """Evaluate the transform once at the centre of every LUT cell; entries are indexed b, g, r."""
+    size = 1 << bits
+    step = 256 // size
+    levels = np.minimum(np.arange(size) * step + step // 2, 255)
+    b, g, r = np.meshgrid(levels, levels, levels, indexing="ij")
+    grid = np.stack([b.ravel(), g.ravel(), r.ravel()], axis=1)
+    return apply_color_matrix(matrix, grid)
+
+
+class ColorCorrection:
+    """Per-eye colour correction applied through precomputed 3D lookup tables.
+
+    The lookup runs in cv2.remap: each LUT is laid out as an image with a row per (b, g) and a column
+    per r, and every pixel's quantised channels are shuffled into the bytes of a 16-bit remap map.
+    """
+
+    def __init__(self, left_lut, right_lut, bits=7):
+        if bits > 7:
+            raise ValueError("Colour LUTs support at most 7 bits per channel")   # remap rows must fit in int16
+        self.bits = bits
+        self.luts = {"left": np.ascontiguousarray(left_lut), "right": np.ascontiguousarray(right_lut)}
+        self.quantize = (np.arange(256) >> (8 - bits)).astype(np.uint8)
+
+        # Row b * 256 + g, column r; rows for g beyond the table size are never looked up
+        size = 1 << bits
+        self.lut_images = {}
+        for eye, lut in self.luts.items():
+            image = np.zeros((size, 256, size, 3), np.uint8)
+            image[:, :size] = lut.reshape(size, size, size, 3)
+            self.lut_images[eye] = np.ascontiguousarray(image.reshape(size * 256, size, 3)[:(size - 1) * 256 + size])
+        self.buffers = {}
+
+    @classmethod
+    def from_charts(cls, left_frame, right_frame, bits=7):
+        """Fit both eyes to the reference chart; returns (correction, report) or (None, error)."""
+        left_patches = sample_chart(left_frame)
+        right_patches = sample_chart(right_frame)
+        if left_patches is None or right_patches is None:
+            return None, "Chart not found"
+
+        left_matrix = fit_color_matrix(left_patches)
+        right_matrix = fit_color_matrix(right_patches)
+
+        # Residuals against the reference and between the corrected eyes, in 8-bit levels
+        left_fit = apply_color_matrix(left_matrix, left_patches).astype(np.float32)
+        right_fit = apply_color_matrix(right_matrix, right_patches).astype(np.float32)
+        left_error = np.abs(left_fit - REFERENCE_BGR).mean()
+        right_error = np.abs(right_fit - REFERENCE_BGR).mean()
+        report = f"error L {left_error:.1f}, R {right_error:.1f}, L-R {np.abs(left_fit - right_fit).mean():.1f}"
+
+        # Patches that no transform maps onto the reference were not sampled from a chart
+        if max(left_error, right_error) > MAX_FIT_ERROR:
+            return None, f"Fit rejected, {report}"
+        return cls(build_lut(left_matrix, bits), build_lut(right_matrix, bits), bits), report
+
+    def save(self, path):
+        np.savez_compressed(path, left=self.luts["left"], right=self.luts["right"], bits=np.array(self.bits))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["left"], data["right"], int(data["bits"]))
+
+    def apply(self, left_frame, right_frame):
+        return self._apply("left", left_frame), self._apply("right", right_frame)
+
+    def _apply(self, eye, frame):
+        key = (eye, frame.shape)
+        buffers = self.buffers.get(key)
+        if buffers is None:
+            # The map's second byte stays zero, so each pixel reads as the int16 pair (r, b * 256 + g)
+            buffers = (np.zeros(frame.shape[:2] + (4,), np.uint8), np.empty(frame.shape, np.uint8))
+            self.buffers[key] = buffers
+        coordinates, output = buffers
+
+        cv2.mixChannels([frame], [coordinates], [2, 0, 1, 2, 0, 3])
+        cv2.LUT(coordinates, self.quantize, dst=coordinates)
+        cv2.remap(self.lut_images[eye], coordinates.view(np.int16), None, cv2.INTER_NEAREST, dst=output)
+        return output
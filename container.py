@@ -0,0 +1,215 @@
+"""Native stereo recording container: a fixed header, frames stored back to back and a frame index.
+
+Layout:
+    header   64 bytes, see HEADER
+    frames   per frame one index record followed by the left and right eye data
+    index    every index record again, contiguous, written when the file is closed
+
+Uncompressed frames are read as zero-copy views into a memory mapping of the file. The header is
+written with the first frame, so if a recording was not closed cleanly the index is rebuilt by
+walking the per-frame records.
+
+Export to per-eye video files for sharing:
+    python container.py recording.stereo --format mp4
+"""
+import os
+import cv2
+import zlib
+import struct
+import argparse
+import numpy as np
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+MAGIC = b"STEREO\x00\x01"
+VERSION = 1
+HEADER = struct.Struct("<8sIIIIIdQQ")   # magic, version, width, height, channels, compression, fps, frames, index offset
+HEADER_SIZE = 64
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("timestamp", "<f8"), ("left_size", "<u4"), ("right_size", "<u4")])
+EXTENSION = ".stereo"
+
+# Lossless per-frame compression; lz4 is used when installed, zlib at its fastest level otherwise
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_LZ4 = 2
+COMPRESSION_NAMES = {"none": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "lz4": COMPRESSION_LZ4}
+
+
+def compression_code(name):
+    """Resolve a compression name; "lossless" picks the fastest available codec."""
+    if name in (None, "none"):
+        return COMPRESSION_NONE
+    if name == "lossless":
+        return COMPRESSION_LZ4 if lz4 is not None else COMPRESSION_ZLIB
+    if name == "lz4" and lz4 is None:
+        print("Warning: lz4 is not installed, falling back to zlib compression.")
+        return COMPRESSION_ZLIB
+    return COMPRESSION_NAMES[name]
+
+
+class StereoWriter:
+    """Appends stereo pairs with their capture timestamps to a container file."""
+
+    def __init__(self, path, fps, compression=None):
+        self.path = path
+        self.fps = fps
+        self.compression = compression_code(compression)
+        self.shape = None
+        self.index = []
+        self.file = open(path, "wb")
+        self.file.write(bytes(HEADER_SIZE))   # filled in with the first frame and again on close
+
+    def write(self, left_frame, right_frame, timestamp):
+        if self.shape is None:
+            # The layout is known now, so a recording cut short can still be read back
+            self.shape = left_frame.shape if left_frame.ndim == 3 else left_frame.shape + (1,)
+            self._write_header(0, 0)
+        if left_frame.shape[:2] != self.shape[:2] or right_frame.shape[:2] != self.shape[:2]:
+            raise ValueError(f"Stereo frames must all be {self.shape[1]}x{self.shape[0]}")
+
+        left_data = self._encode(left_frame)
+        right_data = self._encode(right_frame)
+        record = (self.file.tell() + INDEX_DTYPE.itemsize, timestamp, len(left_data), len(right_data))
+        self.file.write(np.array([record], INDEX_DTYPE).tobytes())
+        self.file.write(left_data)
+        self.file.write(right_data)
+        self.index.append(record)
+
+    def _encode(self, frame):
+        data = memoryview(np.ascontiguousarray(frame)).cast("B")
+        if self.compression == COMPRESSION_ZLIB:
+            return zlib.compress(data, 1)
+        if self.compression == COMPRESSION_LZ4:
+            return lz4.frame.compress(data)
+        return data
+
+    def size(self):
+        return self.file.tell()
+
+    def close(self):
+        """Append the index and fill in the header; until then the file is only recoverable by a scan."""
+        if self.file.closed:
+            return
+        index_offset = self.file.tell()
+        self.file.write(np.array(self.index, INDEX_DTYPE).tobytes())
+        self._write_header(len(self.index), index_offset)
+        self.file.close()
+
+    def _write_header(self, frames, index_offset):
+        height, width, channels = self.shape or (0, 0, 0)
+        position = self.file.tell()
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, width, height, channels, self.compression,
+                                    float(self.fps), frames, index_offset))
+        self.file.seek(position)
+
+
+class StereoReader:
+    """Random access to the frames of a container through a read-only memory mapping."""
+
+    def __init__(self, path):
+        self.path = path
+
+        # A file whose header is still buffered in its writer cannot be mapped at all
+        if os.path.getsize(path) < HEADER_SIZE:
+            raise IOError(f"Not a stereo container or empty recording: {path}")
+        self.data = np.memmap(path, np.uint8, mode="r")
+        magic, version, width, height, channels, compression, fps, frames, index_offset = \
+            HEADER.unpack(bytes(self.data[:HEADER.size]))
+        if magic != MAGIC:
+            raise IOError(f"Not a stereo container or empty recording: {path}")
+        if version > VERSION:
+            raise IOError(f"Stereo container version {version} is newer than supported: {path}")
+        self.shape = (height, width, channels)
+        self.compression = compression
+        self.fps = fps
+
+        # No index offset means the writer never closed the file
+        self.recovered = index_offset == 0
+        if self.recovered:
+            self.index = self._scan()
+            print(f"Warning: {path} was not closed cleanly, recovered {len(self.index)} frames.")
+        else:
+            self.index = self.data[index_offset:index_offset + frames * INDEX_DTYPE.itemsize].view(INDEX_DTYPE)
+        self.frame_count = len(self.index)
+
+    def _scan(self):
+        """Rebuild the index of an unfinished file from the record in front of every frame."""
+        records = []
+        position = HEADER_SIZE
+        size = len(self.data)
+        while position + INDEX_DTYPE.itemsize <= size:
+            record = self.data[position:position + INDEX_DTYPE.itemsize].view(INDEX_DTYPE)[0]
+            end = int(record["offset"]) + int(record["left_size"]) + int(record["right_size"])
+            if int(record["offset"]) != position + INDEX_DTYPE.itemsize or end > size:
+                break
+            records.append(record)
+            position = end
+        return np.array(records, INDEX_DTYPE)
+
+    def __len__(self):
+        return self.frame_count
+
+    def timestamp(self, index):
+        return float(self.index[index]["timestamp"])
+
+    def frame(self, index):
+        """Return (left, right, timestamp); uncompressed frames are read-only views into the file."""
+        record = self.index[index]
+        left_start = int(record["offset"])
+        right_start = left_start + int(record["left_size"])
+        left_frame = self._decode(self.data[left_start:right_start])
+        right_frame = self._decode(self.data[right_start:right_start + int(record["right_size"])])
+        return left_frame, right_frame, float(record["timestamp"])
+
+    def _decode(self, data):
+        if self.compression == COMPRESSION_ZLIB:
+            data = np.frombuffer(zlib.decompress(data), np.uint8)
+        elif self.compression == COMPRESSION_LZ4:
+            data = np.frombuffer(lz4.frame.decompress(data), np.uint8)
+        frame = np.asarray(data).reshape(self.shape)
+        return frame[..., 0] if self.shape[2] == 1 else frame
+
+    def close(self):
+        # The mapping closes once the last view into it is gone
+        self.data = None
+        self.index = None
+
+
+def export_video(path, folder=None, fmt="avi"):
+    """Write the left and right eyes of a container to separate video files; returns their paths."""
+    reader = StereoReader(path)
+    folder = folder or os.path.dirname(os.path.abspath(path))
+    name = os.path.splitext(os.path.basename(path))[0]
+    fourcc = cv2.VideoWriter_fourcc(*("mp4v" if fmt == "mp4" else "XVID"))
+    fps = reader.fps if reader.fps > 0 else 30.0
+    height, width = reader.shape[:2]
+
+    paths = [os.path.join(folder, f"{name}_{eye}_video.{fmt}") for eye in ("left", "right")]
+    writers = [cv2.VideoWriter(video_path, fourcc, fps, (width, height)) for video_path in paths]
+    for index in range(len(reader)):
+        left_frame, right_frame, _ = reader.frame(index)
+        writers[0].write(left_frame)
+        writers[1].write(right_frame)
+    for writer in writers:
+        writer.release()
+    reader.close()
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="stereo container to export")
+    parser.add_argument("--format", choices=("avi", "mp4"), default="mp4", help="video format to write")
+    parser.add_argument("--output", help="folder for the exported files, next to the recording by default")
+    args = parser.parse_args()
+
+    paths = export_video(args.path, args.output, args.format)
+    print(f"Exported stereo videos: {paths[0]} and {paths[1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import cv2
+import time
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+def compute_disparity(left_gray, right_gray, disparities, block_size):
+    """Block-match a rectified grey pair; returns (colour-mapped disparity, centre disparity, elapsed ms)."""
+    start = time.perf_counter()
+    matcher = cv2.StereoBM_create(numDisparities=disparities, blockSize=block_size)
+    disparity = matcher.compute(left_gray, right_gray).astype(np.float32) / 16.0   # fixed point, 4 fraction bits
+
+    # Median over the valid pixels of the central patch, for a depth readout
+    height, width = disparity.shape
+    centre = disparity[height * 2 // 5:height * 3 // 5, width * 2 // 5:width * 3 // 5]
+    valid = centre[centre > 0]
+    centre_disparity = float(np.median(valid)) if valid.size else None
+
+    normalised = np.clip(disparity * (255.0 / disparities), 0, 255).astype(np.uint8)
+    coloured = cv2.applyColorMap(normalised, cv2.COLORMAP_JET)
+    coloured[disparity <= 0] = 0
+    return coloured, centre_disparity, (time.perf_counter() - start) * 1000
+
+
+class DepthPreview:
+    """Disparity of the live pair computed in a worker process at its own rate, within a time budget."""
+
+    def __init__(self, interval=0.2, budget_ms=60.0, scale=0.5, min_scale=0.125, max_scale=0.5,
+                 disparity_fraction=0.25, block_size=15):
+        self.interval = interval              # at most one job started per interval
+        self.budget_ms = budget_ms
+        self.scale = scale                    # downscale of the views before matching
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.disparity_fraction = disparity_fraction   # search range as a share of the scaled width
+        self.block_size = block_size
+        self.executor = None
+        self.pending = None
+        self.pending_scale = None
+        self.last_submit = 0.0
+        self.result = None
+        self.warned = False
+
+        # Counters
+        self.jobs = 0
+        self.compute_ms = 0.0
+        self.worker_failures = 0
+
+    def disparities(self, width):
+        """Search range for a scaled width, a multiple of 16 as block matching requires."""
+        return max(16, int(width * self.disparity_fraction) // 16 * 16)
+
+    def submit(self, left_frame, right_frame, rectified=True):
+        """Start a job on this pair unless one is running or the last one started too recently."""
+        now = time.perf_counter()
+        if self.pending is not None or now - self.last_submit < self.interval:
+            return False
+        if not rectified and not self.warned:
+            print("Warning: Depth preview needs rectified frames to be accurate; calibrate and enable Rectify.")
+            self.warned = True
+
+        # Shrink and convert here so only small grey images are sent to the worker
+        height, width = left_frame.shape[:2]
+        size = (max(int(width * self.scale), 32), max(int(height * self.scale), 32))
+        left_gray = cv2.cvtColor(cv2.resize(left_frame, size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        right_gray = cv2.cvtColor(cv2.resize(right_frame, size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+
+        block_size = min(self.block_size, (min(size) // 4) | 1)
+        args = (compute_disparity, left_gray, right_gray, self.disparities(size[0]), max(block_size, 5))
+        try:
+            self.pending = self.pool().submit(*args)
+        except BrokenProcessPool:
+            # The idle worker died since the last job; replace it once
+            self.worker_failures += 1
+            self.shutdown()
+            self.pending = self.pool().submit(*args)
+        self.pending_scale = self.scale
+        self.last_submit = now
+        return True
+
+    def pool(self):
+        if self.executor is None:
+            # Spawn rather than fork: forking while capture and Tk threads hold locks can deadlock the child
+            self.executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        return self.executor
+
+    def poll(self):
+        """Return a new (coloured disparity, centre disparity at full scale) once a job finishes, else None."""
+        if self.pending is None or not self.pending.done():
+            return None
+        future, self.pending = self.pending, None
+        try:
+            coloured, centre_disparity, elapsed = future.result()
+        except cv2.error as error:
+            print(f"Error: Disparity computation failed: {error}")
+            return None
+        except BrokenProcessPool:
+            # The worker died; drop the pool so the next submit starts a fresh one
+            print("Error: Depth worker process stopped unexpectedly; restarting it.")
+            self.worker_failures += 1
+            self.shutdown()
+            return None
+        self.jobs += 1
+        self.compute_ms = elapsed
+
+        # Trade resolution, and with it the disparity range, for time
+        if elapsed > self.budget_ms:
+            self.scale = max(self.scale * 0.8, self.min_scale)
+        elif elapsed < self.budget_ms * 0.5:
+            self.scale = min(self.scale * 1.1, self.max_scale)
+
+        if centre_disparity is not None:
+            centre_disparity /= self.pending_scale
+        self.result = (coloured, centre_disparity)
+        return self.result
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
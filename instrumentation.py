@@ -0,0 +1,135 @@
+import os
+import csv
+import json
+import time
+from collections import deque
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class Instrumentation:
+    """Per-stage pipeline timers with rolling latency percentiles; does nothing while disabled."""
+
+    def __init__(self, enabled=False, window=600, history=100000):
+        self.enabled = enabled
+        self.window = window                     # samples kept per stage for percentiles
+        self.samples = {}
+        self.frames = deque(maxlen=history)      # per-frame stage timings for export
+        self.current = None
+        self.counters = {}
+        self.process = psutil.Process() if psutil is not None else None
+        self.created = time.time()
+        self.startup = {}                        # milestone -> seconds since the process started
+
+    def mark(self):
+        """Start timing; returns None while disabled so lap() costs a single comparison."""
+        if not self.enabled:
+            return None
+        return time.perf_counter()
+
+    def lap(self, stage, mark):
+        """Record the time since mark under stage and return a new mark."""
+        if mark is None:
+            return None
+        now = time.perf_counter()
+        self.record(stage, (now - mark) * 1000, in_frame=True)
+        return now
+
+    def record(self, stage, ms, in_frame=False):
+        """Add a duration in milliseconds; worker threads must leave in_frame off."""
+        if not self.enabled:
+            return
+        samples = self.samples.get(stage)
+        if samples is None:
+            samples = self.samples.setdefault(stage, deque(maxlen=self.window))
+        samples.append(ms)
+        if in_frame and self.current is not None:
+            self.current[stage] = ms
+
+    def begin_frame(self):
+        if self.enabled:
+            self.current = {"time": time.perf_counter()}
+
+    def end_frame(self):
+        if self.current is not None:
+            self.frames.append(self.current)
+            self.current = None
+
+    def add_counter(self, name, source):
+        """Register a callable polled whenever a summary is taken."""
+        self.counters[name] = source
+
+    def reset(self):
+        self.samples = {}
+        self.frames.clear()
+        self.current = None
+
+    def percentiles(self, stage):
+        values = sorted(self.samples.get(stage, ()))
+        if not values:
+            return None
+        last = len(values) - 1
+        return {
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "p50": values[round(0.50 * last)],
+            "p95": values[round(0.95 * last)],
+            "p99": values[round(0.99 * last)],
+        }
+
+    def process_age(self):
+        """Seconds since this process started, or since this object was created without psutil."""
+        if self.process is None:
+            return time.time() - self.created
+        return time.time() - self.process.create_time()
+
+    def mark_startup(self, milestone):
+        """Record when a startup milestone was first reached; recorded even while disabled."""
+        if milestone not in self.startup:
+            self.startup[milestone] = self.process_age()
+
+    def memory_mb(self):
+        """Resident memory of this process, or None without psutil."""
+        if self.process is None:
+            return None
+        return self.process.memory_info().rss / (1024 * 1024)
+
+    def summary(self):
+        return {
+            "stages": {stage: self.percentiles(stage) for stage in list(self.samples)},
+            "counters": {name: source() for name, source in self.counters.items()},
+            "memory_mb": self.memory_mb(),
+            "startup": dict(self.startup),
+        }
+
+    def hud_text(self):
+        """Short multi-line summary for the on-screen overlay."""
+        summary = self.summary()
+        lines = ["stage              p50    p95    p99 ms"]
+        for stage, stats in summary["stages"].items():
+            if stats is not None:
+                lines.append(f"{stage:<16}{stats['p50']:>6.1f} {stats['p95']:>6.1f} {stats['p99']:>6.1f}")
+        for name, value in summary["counters"].items():
+            lines.append(f"{name}: {value:.1f}" if isinstance(value, float) else f"{name}: {value}")
+        if summary["memory_mb"] is not None:
+            lines.append(f"memory: {summary['memory_mb']:.0f} MB")
+        return "\n".join(lines)
+
+    def export(self, folder, name):
+        """Write per-frame timings to CSV and the summary to JSON; returns both paths."""
+        csv_path = os.path.join(folder, f"{name}_performance.csv")
+        json_path = os.path.join(folder, f"{name}_performance.json")
+
+        frames = list(self.frames)
+        columns = ["time"] + sorted({stage for frame in frames for stage in frame if stage != "time"})
+        with open(csv_path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(frames)
+
+        with open(json_path, "w") as file:
+            json.dump(self.summary(), file, indent=2)
+        return csv_path, json_path
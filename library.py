@@ -0,0 +1,211 @@
+import os
+import re
+import cv2
+import json
+import hashlib
+import threading
+import numpy as np
+from container import StereoReader, EXTENSION
+
+VIDEO_EXTENSIONS = (".avi", ".mp4")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tiff")
+EYE_PATTERN = re.compile(r"left|right")
+THUMBNAIL_HEIGHT = 72
+
+
+def session_key(filename):
+    """Name shared by the two eyes of a session, with the last "left"/"right" replaced by "*"; None if no eye."""
+    matches = list(EYE_PATTERN.finditer(filename))
+    if not matches:
+        return None, None
+    match = matches[-1]
+    return filename[:match.start()] + "*" + filename[match.end():], match.group()
+
+
+def media_kind(filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == EXTENSION:
+        return "stereo"
+    if extension in VIDEO_EXTENSIONS:
+        return "video"
+    if extension in IMAGE_EXTENSIONS:
+        return "image"
+    return None
+
+
+def probe_video(path):
+    """Read the metadata of a video file and its first frame."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return None, None
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    info = {
+        "fps": fps,
+        "frames": frames,
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "duration": frames / fps if fps > 0 else None,
+    }
+    _, frame = cap.read()
+    cap.release()
+    return info, frame
+
+
+def probe_image(path):
+    frame = cv2.imread(path)
+    if frame is None:
+        return None, None
+    height, width = frame.shape[:2]
+    return {"fps": None, "frames": 1, "width": width, "height": height, "duration": None}, frame
+
+
+def probe_container(path):
+    """Read a stereo container's header and index; returns the metadata and its first pair side by side."""
+    try:
+        reader = StereoReader(path)
+    except IOError:
+        return None, None
+    info = {"fps": reader.fps, "frames": len(reader), "width": reader.shape[1], "height": reader.shape[0],
+            "duration": reader.timestamp(len(reader) - 1) - reader.timestamp(0) if len(reader) else None}
+    frame = None
+    if len(reader):
+        left_frame, right_frame, _ = reader.frame(0)
+        frame = np.hstack([left_frame, right_frame])
+    reader.close()
+    return info, frame
+
+
+class MediaLibrary:
+    """On-disk index of recorded sessions with their metadata and thumbnails, updated incrementally."""
+
+    def __init__(self, folder):
+        self.folder = folder                       # settings folder holding the index and thumbnails
+        self.index_path = os.path.join(folder, "library.json")
+        self.thumbnail_folder = os.path.join(folder, "thumbnails")
+        self.lock = threading.Lock()
+        self.files = {}                            # path -> {"mtime", "size", "info", "thumbnail"}
+        self.probed = 0
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path) as file:
+                self.files = json.load(file)["files"]
+        except (OSError, ValueError, KeyError) as error:
+            print(f"Warning: Could not read media library index, rebuilding it: {error}")
+            self.files = {}
+
+    def save(self):
+        os.makedirs(self.folder, exist_ok=True)
+        with self.lock:
+            data = json.dumps({"files": self.files})
+        temporary = self.index_path + ".tmp"
+        with open(temporary, "w") as file:
+            file.write(data)
+        os.replace(temporary, self.index_path)
+
+    def sessions(self, folder):
+        """Sessions in a folder from the index alone, newest first; nothing is opened or decoded."""
+        folder = os.path.abspath(folder)
+        with self.lock:
+            files = {path: entry for path, entry in self.files.items() if os.path.dirname(path) == folder}
+        return self._pair(files)
+
+    def scan(self, folder):
+        """Bring the index up to date with a folder, probing only new or changed files; returns its sessions."""
+        folder = os.path.abspath(folder)
+        seen = set()
+        for entry in os.scandir(folder):
+            if not entry.is_file() or media_kind(entry.name) is None:
+                continue
+            path = entry.path
+            seen.add(path)
+            stat = entry.stat()
+            with self.lock:
+                cached = self.files.get(path)
+            if cached is not None and cached["mtime"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+                continue
+            self._probe(path, stat)
+
+        # Forget files that have been deleted
+        with self.lock:
+            for path in [path for path in self.files if os.path.dirname(path) == folder and path not in seen]:
+                self._remove_thumbnail(self.files.pop(path))
+        self.save()
+        return self.sessions(folder)
+
+    def _probe(self, path, stat):
+        kind = media_kind(path)
+        if kind == "stereo":
+            info, frame = probe_container(path)
+        elif kind == "video":
+            info, frame = probe_video(path)
+        else:
+            info, frame = probe_image(path)
+        self.probed += 1
+
+        thumbnail = None
+        if frame is not None:
+            name = hashlib.sha1(f"{path}:{stat.st_mtime_ns}".encode()).hexdigest()
+            thumbnail = os.path.join(self.thumbnail_folder, f"{name}.jpg")
+            height, width = frame.shape[:2]
+            small = cv2.resize(frame, (max(width * THUMBNAIL_HEIGHT // height, 1), THUMBNAIL_HEIGHT),
+                               interpolation=cv2.INTER_AREA)
+            os.makedirs(self.thumbnail_folder, exist_ok=True)
+            cv2.imwrite(thumbnail, small, [cv2.IMWRITE_JPEG_QUALITY, 80])
+
+        with self.lock:
+            previous = self.files.get(path)
+            if previous is not None:
+                self._remove_thumbnail(previous)
+            self.files[path] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "info": info, "thumbnail": thumbnail}
+
+    def _remove_thumbnail(self, entry):
+        if entry.get("thumbnail") and os.path.exists(entry["thumbnail"]):
+            os.remove(entry["thumbnail"])
+
+    def _pair(self, files):
+        """Group indexed files into sessions: one container, or a left and right file sharing a session key."""
+        sessions = []
+        eyes = {}
+        for path, entry in files.items():
+            if entry["info"] is None:
+                continue        # unreadable file
+            filename = os.path.basename(path)
+            kind = media_kind(filename)
+            if kind == "stereo":
+                sessions.append(self._session(filename, kind, entry, path=path))
+                continue
+            key, eye = session_key(filename)
+            if key is not None:
+                eyes.setdefault(key, {})[eye] = (path, entry)
+
+        for key, pair in eyes.items():
+            if "left" not in pair or "right" not in pair:
+                continue        # a session needs both eyes
+            (left_path, left_entry), (right_path, _) = pair["left"], pair["right"]
+            name = key.replace("_*", "").replace("*", "")
+            sessions.append(self._session(name, media_kind(left_path), left_entry, left=left_path, right=right_path))
+
+        sessions.sort(key=lambda session: session["modified"], reverse=True)
+        return sessions
+
+    def _session(self, name, kind, entry, **paths):
+        session = {"name": os.path.splitext(name)[0], "kind": kind, "modified": entry["mtime"],
+                   "thumbnail": entry["thumbnail"]}
+        session.update(entry["info"])
+        session.update(paths)
+        return session
+
+
+def describe(session):
+    """One line summary of a session for the library list."""
+    text = f"{session['name']}  [{session['kind']}]  {session['width']}x{session['height']}"
+    if session.get("duration"):
+        text += f"  {session['duration']:.1f} s"
+    if session.get("fps"):
+        text += f"  {session['fps']:.0f} fps"
+    return text
@@ -0,0 +1,266 @@
+import cv2
+import threading
+from collections import OrderedDict
+from container import StereoReader
+
+
+class PlaybackEngine:
+    """Decodes a stereo video pair on demand with a bounded LRU cache and a prefetch thread."""
+
+    def __init__(self, left_path, right_path, cache_mb=256, prefetch=16):
+        self.left_cap = cv2.VideoCapture(left_path)
+        self.right_cap = cv2.VideoCapture(right_path)
+        if not (self.left_cap.isOpened() and self.right_cap.isOpened()):
+            self.left_cap.release()
+            self.right_cap.release()
+            raise IOError(f"Could not open stereo videos: {left_path} and {right_path}")
+
+        self.fps = self.left_cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(min(self.left_cap.get(cv2.CAP_PROP_FRAME_COUNT),
+                              self.right_cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+        self.frame_count = frame_count if frame_count > 0 else None  # None until the end is found
+
+        # Decoded stereo pairs, least recently used first
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+        self.cache_bytes = 0
+        self.cache_budget = cache_mb * 1024 * 1024
+        self.pair_bytes = None
+        self.prefetch = prefetch
+
+        # The two capture handles are only touched while holding decode_lock
+        self.decode_lock = threading.Lock()
+        self.decode_pos = 0
+
+        # Playback state
+        self.position = 0
+        self.speed = 1.0
+        self.paused = False
+        self.phase = 0.0
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.seeks = 0
+
+        # Files can open yet hold nothing decodable; find out now rather than mid-playback
+        if self._decode(0) is None:
+            self.left_cap.release()
+            self.right_cap.release()
+            raise IOError(f"No decodable frames in stereo videos: {left_path} and {right_path}")
+
+        self.running = True
+        self.wakeup = threading.Condition()
+        self.worker = threading.Thread(target=self._prefetch_loop, name="playback-prefetch", daemon=True)
+        self.worker.start()
+
+    def next_frame(self):
+        """Return the stereo pair at the current position, then advance by the playback speed."""
+        pair = self.get(self.position)
+        if pair is None:
+            # Ran past the real end of the file; loop back to the start
+            self.position = 0
+            pair = self.get(0)
+
+        if not self.paused:
+            self.step(speed=self.speed)
+        return pair
+
+    def step(self, frames=1, speed=None):
+        """Move the position by whole frames, or by a fractional speed accumulated across calls."""
+        if speed is not None:
+            self.phase += speed
+            frames = int(self.phase)
+            self.phase -= frames
+        self.seek(self.position + frames, keep_phase=True)
+
+    def seek(self, index, keep_phase=False):
+        """Jump to an exact frame index, wrapping around the ends of the video."""
+        if self.frame_count:
+            index %= self.frame_count
+        else:
+            index = max(index, 0)
+        self.position = index
+        if not keep_phase:
+            self.phase = 0.0
+        with self.wakeup:
+            self.wakeup.notify()
+
+    def set_speed(self, speed):
+        """Set playback speed in frames per tick; negative values play in reverse."""
+        self.speed = speed
+        self.phase = 0.0
+        with self.wakeup:
+            self.wakeup.notify()
+
+    def get(self, index):
+        """Return the decoded stereo pair at index, or None past the end of the video."""
+        pair = self._cached(index)
+        if pair is not None:
+            self.hits += 1
+            return pair
+
+        self.misses += 1
+        with self.decode_lock:
+            pair = self._cached(index)  # the prefetcher may have just decoded it
+            if pair is None:
+                pair = self._decode(index)
+        return pair
+
+    def _cached(self, index):
+        with self.cache_lock:
+            pair = self.cache.get(index)
+            if pair is not None:
+                self.cache.move_to_end(index)
+            return pair
+
+    def _decode(self, index):
+        """Decode one pair, seeking both handles only if they are not already there."""
+        if self.frame_count is not None and index >= self.frame_count:
+            return None
+        if index != self.decode_pos:
+            self.left_cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self.right_cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self.seeks += 1
+
+        ret_left, left_frame = self.left_cap.read()
+        ret_right, right_frame = self.right_cap.read()
+        if not (ret_left and ret_right):
+            # The container over-reported its length; remember where it really ends
+            self.decode_pos = -1
+            self.frame_count = index if index > 0 else None
+            return None
+        self.decode_pos = index + 1
+
+        pair = (left_frame, right_frame)
+        self._store(index, pair)
+        return pair
+
+    def _store(self, index, pair):
+        size = pair[0].nbytes + pair[1].nbytes
+        self.pair_bytes = size
+        with self.cache_lock:
+            self.cache[index] = pair
+            self.cache_bytes += size
+            while self.cache_bytes > self.cache_budget and len(self.cache) > 1:
+                _, evicted = self.cache.popitem(last=False)
+                self.cache_bytes -= evicted[0].nbytes + evicted[1].nbytes
+
+    def _prefetch_window(self):
+        """Indices the prefetcher should have decoded, in the direction of playback."""
+        depth = self.prefetch
+        if self.pair_bytes:
+            depth = min(depth, max(self.cache_budget // self.pair_bytes - 1, 0))
+        if self.speed >= 0:
+            window = range(self.position + 1, self.position + 1 + depth)
+        else:
+            # Reverse: decode the block behind us forwards, since decoding backwards means a seek per frame
+            window = range(self.position - depth, self.position)
+        if self.frame_count:
+            return [index % self.frame_count for index in window]
+        return [index for index in window if index >= 0]
+
+    def _prefetch_loop(self):
+        while self.running:
+            missing = None
+            for index in self._prefetch_window():
+                if not self._cached_index(index):
+                    missing = index
+                    break
+
+            if missing is None:
+                with self.wakeup:
+                    self.wakeup.wait(0.05)
+                continue
+
+            with self.decode_lock:
+                if not self.running or self._cached_index(missing):
+                    continue
+                pair = self._decode(missing)
+            if pair is None:
+                with self.wakeup:
+                    self.wakeup.wait(0.05)
+
+    def _cached_index(self, index):
+        with self.cache_lock:
+            return index in self.cache
+
+    def release(self):
+        """Stop prefetching and close both video files."""
+        self.running = False
+        with self.wakeup:
+            self.wakeup.notify()
+        self.worker.join(timeout=1.0)
+        with self.decode_lock:
+            self.left_cap.release()
+            self.right_cap.release()
+
+
+class ContainerPlayback:
+    """Plays a stereo container; its index makes every frame a direct lookup, so nothing is cached."""
+
+    def __init__(self, path):
+        self.reader = StereoReader(path)
+        if len(self.reader) == 0:
+            raise IOError(f"Stereo recording has no frames: {path}")
+        self.fps = self.reader.fps
+        self.frame_count = len(self.reader)
+
+        # Playback state
+        self.position = 0
+        self.speed = 1.0
+        self.paused = False
+        self.phase = 0.0
+
+    def next_frame(self):
+        """Return the stereo pair at the current position, then advance by the playback speed."""
+        left_frame, right_frame, _ = self.reader.frame(self.position)
+        if not self.paused:
+            self.step(speed=self.speed)
+        return left_frame, right_frame
+
+    def step(self, frames=1, speed=None):
+        if speed is not None:
+            self.phase += speed
+            frames = int(self.phase)
+            self.phase -= frames
+        self.seek(self.position + frames, keep_phase=True)
+
+    def seek(self, index, keep_phase=False):
+        self.position = index % self.frame_count
+        if not keep_phase:
+            self.phase = 0.0
+
+    def set_speed(self, speed):
+        self.speed = speed
+        self.phase = 0.0
+
+    def release(self):
+        self.reader.close()
+
+
+class StillImagePlayback:
+    """Playback source for a stereo image pair, shown as a single repeating frame."""
+
+    def __init__(self, left_image, right_image):
+        self.pair = (left_image, right_image)
+        self.fps = None
+        self.frame_count = 1
+        self.position = 0
+        self.speed = 1.0
+        self.paused = False
+
+    def next_frame(self):
+        return self.pair
+
+    def step(self, frames=1, speed=None):
+        pass
+
+    def seek(self, index, keep_phase=False):
+        pass
+
+    def set_speed(self, speed):
+        pass
+
+    def release(self):
+        pass
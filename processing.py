@@ -0,0 +1,166 @@
+import cv2
+import math
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, wait
+from color import srgb_to_linear, linear_to_srgb
+
+
+def kelvin_to_bgr(temperature):
+    """Approximate colour of a black body at the given temperature, as BGR in 0-255."""
+    t = temperature / 100.0
+    red = 255.0 if t <= 66 else 329.698727446 * (t - 60) ** -0.1332047592
+    if t <= 66:
+        green = 99.4708025861 * math.log(t) - 161.1195681661
+    else:
+        green = 288.1221695283 * (t - 60) ** -0.0755148492
+    if t >= 66:
+        blue = 255.0
+    elif t <= 19:
+        blue = 0.0
+    else:
+        blue = 138.5177312231 * math.log(t - 10) - 305.0447927307
+    return np.clip(np.array([blue, green, red], np.float32), 1.0, 255.0)
+
+
+def white_balance_gains(temperature, reference=4000):
+    """Per-channel BGR gains that neutralise a light source of the given temperature, normalised to green."""
+    gains = kelvin_to_bgr(reference) / kelvin_to_bgr(temperature)
+    return gains / gains[1]
+
+
+def denoise(frame, strength, quality, buffers=None):
+    """Edge-preserving bilateral filter; lower quality shrinks the kernel, then the resolution."""
+    buffers = {} if buffers is None else buffers
+    diameter = 3 + 2 * int(round(3 * strength * quality))
+    sigma = 10 + 60 * strength
+    output = reuse(buffers, "output", frame.shape)
+    if quality >= 0.6:
+        return cv2.bilateralFilter(frame, diameter, sigma, sigma, dst=output)
+
+    factor = 2 if quality >= 0.3 else 4
+    height, width = frame.shape[:2]
+    small_shape = (height // factor, width // factor) + frame.shape[2:]
+    small = reuse(buffers, "small", small_shape)
+    filtered = reuse(buffers, "filtered", small_shape)
+    cv2.resize(frame, (width // factor, height // factor), dst=small, interpolation=cv2.INTER_AREA)
+    cv2.bilateralFilter(small, diameter, sigma, sigma, dst=filtered)
+    return cv2.resize(filtered, (width, height), dst=output, interpolation=cv2.INTER_LINEAR)
+
+
+def reuse(buffers, name, shape):
+    """Scratch buffer of the given shape, allocated only the first time that shape is seen."""
+    key = (name, shape)
+    buffer = buffers.get(key)
+    if buffer is None:
+        buffer = np.empty(shape, np.uint8)
+        buffers[key] = buffer
+    return buffer
+
+
+class EyeProcessor:
+    """Exposure, gain and white balance of one eye folded into a single per-channel lookup table."""
+
+    def __init__(self):
+        self.settings = None
+        self.lut = None
+        self.identity = True
+        self.output = None
+        self.denoise_strength = 0.0
+        self.denoise_buffers = ({}, {})   # two slots, so one can be shown while the other is filled
+        self.slot = 0
+        self.rebuilds = 0
+
+    def update(self, exposure, gain, white_balance, denoising):
+        """Store new settings; the table is only rebuilt if a tone value actually changed."""
+        settings = (exposure, gain, white_balance)
+        if settings != self.settings:
+            self.settings = settings
+            self.lut = None
+        self.denoise_strength = denoising
+
+    def tone(self, frame):
+        if self.settings is None:
+            return frame
+        if self.lut is None:
+            self._build_lut()
+        if self.identity:
+            return frame
+        self.output = cv2.LUT(frame, self.lut, dst=self.output)
+        return self.output
+
+    def _build_lut(self):
+        exposure, gain, white_balance = self.settings
+
+        # Exposure spans +-2 stops around the slider midpoint; everything scales linear light
+        multiplier = 2 ** ((exposure - 50) / 25) * gain
+        channel_gains = multiplier * white_balance_gains(white_balance)
+        linear = srgb_to_linear(np.arange(256))[:, None] * channel_gains[None, :]
+        lut = linear_to_srgb(linear)
+
+        self.identity = np.array_equal(lut, np.repeat(np.arange(256, dtype=np.uint8)[:, None], 3, axis=1))
+        self.lut = lut.reshape(1, 256, 3)
+        self.rebuilds += 1
+
+
+class StereoProcessor:
+    """Per-eye tone and denoising with a per-frame time budget for denoising."""
+
+    def __init__(self, budget_ms=12.0, min_quality=0.15):
+        self.left = EyeProcessor()
+        self.right = EyeProcessor()
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="denoise")
+        self.budget = budget_ms / 1000
+        self.min_quality = min_quality
+        self.quality = 1.0        # share of the requested strength and resolution we can currently afford
+        self.pending = None
+        self.latest = None        # last denoised pair, shown while a newer one is still being filtered
+        self.frames_late = 0
+
+    def process(self, left_frame, right_frame):
+        left_frame = self.left.tone(left_frame)
+        right_frame = self.right.tone(right_frame)
+        if not (self.left.denoise_strength or self.right.denoise_strength):
+            self.latest = None
+            return left_frame, right_frame
+
+        # Never wait on work left over from an earlier frame; repeat the last denoised pair instead,
+        # so the view never alternates between filtered and raw frames
+        if self.pending is not None:
+            if not all(future.done() for future in self.pending):
+                self.frames_late += 1
+                return self.latest if self.latest is not None else (left_frame, right_frame)
+            self.latest = (self.pending[0].result(), self.pending[1].result())
+            self.pending = None
+
+        start = time.perf_counter()
+        futures = [self._submit(self.left, left_frame), self._submit(self.right, right_frame)]
+        _, not_done = wait(futures, timeout=self.budget)
+        if not_done:
+            # Lower the quality for the next frames and show the previous result one frame late
+            self.pending = futures
+            self.frames_late += 1
+            self.quality = max(self.quality * 0.5, self.min_quality)
+            return self.latest if self.latest is not None else (left_frame, right_frame)
+
+        # Creep back up towards full quality while comfortably within budget
+        if time.perf_counter() - start < self.budget * 0.5:
+            self.quality = min(self.quality * 1.1, 1.0)
+        self.latest = (futures[0].result(), futures[1].result())
+        return self.latest
+
+    def _submit(self, eye, frame):
+        """Denoise a private copy of the frame into the eye's other buffer slot.
+
+        Upstream stages reuse their buffers on the next frame, and the previous result may still be shown.
+        """
+        eye.slot ^= 1
+        buffers = eye.denoise_buffers[eye.slot]
+        source = reuse(buffers, "input", frame.shape)
+        np.copyto(source, frame)
+        if not eye.denoise_strength:
+            return self.executor.submit(lambda: source)
+        return self.executor.submit(denoise, source, eye.denoise_strength, self.quality, buffers)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
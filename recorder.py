@@ -0,0 +1,227 @@
+import os
+import cv2
+import time
+import queue
+import threading
+from datetime import datetime
+from container import StereoWriter, EXTENSION
+
+
+class EyeWriter(threading.Thread):
+    """Encodes the frames of one eye to disk as they arrive on its queue."""
+
+    def __init__(self, recorder, eye, queue_size):
+        super().__init__(name=f"recorder-{eye}", daemon=True)
+        self.recorder = recorder
+        self.eye = eye
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.path = None
+        self.frames_written = 0
+
+    def run(self):
+        writer = None
+        segment = -1
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            frame_segment, frame, pooled = item
+
+            # Open a new file whenever the recorder rotates to the next segment
+            if frame_segment != segment:
+                if writer is not None:
+                    writer.release()
+                segment = frame_segment
+                self.path = self.recorder.segment_path(segment, self.eye)
+                height, width = frame.shape[:2]
+                writer = cv2.VideoWriter(self.path, self.recorder.fourcc, self.recorder.fps, (width, height))
+
+            writer.write(frame)
+            self.frames_written += 1
+            if pooled:
+                self.recorder.arena.release(frame)
+
+        if writer is not None:
+            writer.release()
+
+
+class ContainerWriter(threading.Thread):
+    """Writes whole stereo pairs with their timestamps to stereo container files."""
+
+    def __init__(self, recorder, queue_size):
+        super().__init__(name="recorder-stereo", daemon=True)
+        self.recorder = recorder
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.path = None
+        self.frames_written = 0
+
+    def run(self):
+        writer = None
+        segment = -1
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            frame_segment, left_frame, right_frame, timestamp, pooled = item
+
+            if frame_segment != segment:
+                if writer is not None:
+                    writer.close()
+                segment = frame_segment
+                self.path = self.recorder.segment_path(segment)
+                writer = StereoWriter(self.path, self.recorder.fps, self.recorder.compression)
+
+            writer.write(left_frame, right_frame, timestamp)
+            self.frames_written += 1
+            if pooled:
+                self.recorder.arena.release_pair((left_frame, right_frame))
+
+        if writer is not None:
+            writer.close()
+
+
+class StreamingRecorder:
+    """Streams stereo frames from a ring reader to per-eye video files or a stereo container while recording."""
+
+    def __init__(self, folder, fps, fourcc="XVID", queue_size=64, drop_policy="drop",
+                 max_segment_mb=None, max_segment_seconds=None, instrumentation=None, arena=None,
+                 container=False, compression=None):
+        self.folder = folder
+        self.instrumentation = instrumentation
+        self.arena = arena               # pool the drained pairs come from, if any
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self.drop_policy = drop_policy   # "drop" discards new pairs when a writer falls behind, "block" waits
+        self.max_segment_bytes = max_segment_mb * 1024 * 1024 if max_segment_mb else None
+        self.max_segment_seconds = max_segment_seconds
+        self.container = container       # one .stereo file per segment instead of two AVI files
+        self.compression = compression   # container frame compression, see container.compression_code
+
+        if container:
+            self.writers = [ContainerWriter(self, queue_size)]
+        else:
+            self.writers = [EyeWriter(self, "left", queue_size), EyeWriter(self, "right", queue_size)]
+        self.feeder = None
+        self.running = False
+        self.on_finished = None
+
+        # Segment state
+        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.segment = 0
+        self.segment_start = None
+        self.segment_frames = 0
+        self.segments = []
+
+        # Counters
+        self.frames_submitted = 0
+        self.frames_dropped = 0
+
+    def segment_path(self, segment, eye=None):
+        """File path for one eye of a segment, or its container; the first segment keeps the plain session name."""
+        name = self.timestamp if segment == 0 else f"{self.timestamp}_seg{segment:03d}"
+        if self.container:
+            return os.path.join(self.folder, f"{name}_stereo{EXTENSION}")
+        return os.path.join(self.folder, f"{name}_{eye}_video.avi")
+
+    def segment_paths(self, segment):
+        if self.container:
+            return (self.segment_path(segment),)
+        return (self.segment_path(segment, "left"), self.segment_path(segment, "right"))
+
+    def start(self, reader, on_finished=None):
+        """Start writer workers and a feeder thread that drains the given ring reader."""
+        self.reader = reader
+        self.on_finished = on_finished
+        self.running = True
+        self.segments.append(self.segment_paths(0))
+        for writer in self.writers:
+            writer.start()
+        self.feeder = threading.Thread(target=self._feed, name="recorder-feed", daemon=True)
+        self.feeder.start()
+
+    def _feed(self):
+        while self.running:
+            if self.reader.wait(timeout=0.05):
+                self._drain()
+
+        # Pick up frames captured just before stop, then let the writers finish their queues
+        self._drain()
+        for writer in self.writers:
+            writer.queue.put(None)
+        for writer in self.writers:
+            writer.join()
+        print(f"Saved stereo videos: {', '.join(path for paths in self.segments for path in paths)}")
+        if self.on_finished is not None:
+            self.on_finished(self)
+
+    def _drain(self):
+        for left_frame, right_frame, timestamp, seq in self.reader.drain(self.arena):
+            start = time.perf_counter()
+            self.submit(left_frame, right_frame, timestamp, pooled=self.arena is not None)
+            if self.instrumentation is not None:
+                self.instrumentation.record("record_enqueue", (time.perf_counter() - start) * 1000)
+
+    def submit(self, left_frame, right_frame, timestamp, pooled=False):
+        """Queue a stereo pair for encoding; returns False if the pair was dropped.
+
+        Pooled pairs belong to the recorder's arena and are returned to it once written or dropped.
+        """
+        self._rotate_if_needed(timestamp)
+
+        # Drop whole pairs so the left and right files stay frame-aligned
+        if self.drop_policy == "drop" and any(writer.queue.full() for writer in self.writers):
+            self.frames_dropped += 1
+            if pooled:
+                self.arena.release_pair((left_frame, right_frame))
+            return False
+
+        if self.container:
+            self.writers[0].queue.put((self.segment, left_frame, right_frame, timestamp, pooled))
+        else:
+            self.writers[0].queue.put((self.segment, left_frame, pooled))
+            self.writers[1].queue.put((self.segment, right_frame, pooled))
+        self.frames_submitted += 1
+        self.segment_frames += 1
+        return True
+
+    def _rotate_if_needed(self, timestamp):
+        if self.segment_start is None:
+            self.segment_start = timestamp
+            return
+        if self.segment_frames == 0:
+            return
+
+        rotate = False
+        if self.max_segment_seconds and timestamp - self.segment_start >= self.max_segment_seconds:
+            rotate = True
+        elif self.max_segment_bytes and self.segment_frames % max(int(self.fps), 1) == 0:
+            # Checking file sizes once per second of video is plenty
+            size = sum(os.path.getsize(path) for path in self.segments[-1] if os.path.exists(path))
+            rotate = size >= self.max_segment_bytes
+
+        if rotate:
+            self.segment += 1
+            self.segment_start = timestamp
+            self.segment_frames = 0
+            self.segments.append(self.segment_paths(self.segment))
+
+    def stop(self):
+        """Stop recording without waiting; the writers finish their short queues in the background."""
+        self.running = False
+
+    def wait(self, timeout=None):
+        """Block until every queued frame has been written and the files are closed."""
+        if self.feeder is not None:
+            self.feeder.join(timeout)
+
+    def is_finished(self):
+        return self.feeder is None or not self.feeder.is_alive()
+
+    def stats(self):
+        return {
+            "submitted": self.frames_submitted,
+            "dropped": self.frames_dropped + self.reader.dropped,
+            "left_written": self.writers[0].frames_written,
+            "right_written": self.writers[-1].frames_written,
+            "segments": len(self.segments),
+        }
@@ -0,0 +1,78 @@
+import cv2
+import numpy as np
+
+
+class RenderEngine:
+    """Resizes and composites a BGR stereo pair into one reusable RGBA buffer for display.
+
+    RGBA rather than RGB because Pillow can only wrap 4-byte pixels without copying them.
+    """
+
+    def __init__(self):
+        self.geometry = None
+        self.strip = None
+        self.resized = {}
+
+        # Layout, in canvas coordinates
+        self.display_size = 1
+        self.left_x = 0
+        self.right_x = 0
+        self.y = 0
+        self.origin_x = 0
+        self.origin_y = 0
+
+    def set_geometry(self, canvas_width, canvas_height, size_ratio, spacing_ratio, offset_ratio):
+        """Recalculate the layout; returns True only if it changed and buffers were reallocated."""
+        display_size = max(int(canvas_width * size_ratio), 1)
+        center_spacing = int(canvas_width * spacing_ratio / 2)
+        center_offset = int(canvas_width * offset_ratio)
+
+        left_x = (canvas_width // 2) - center_spacing + center_offset
+        right_x = (canvas_width // 2) + center_spacing + center_offset
+        y = canvas_height // 2
+
+        geometry = (display_size, left_x, right_x, y)
+        if geometry == self.geometry:
+            return False
+        self.geometry = geometry
+        self.display_size = display_size
+        self.left_x = left_x
+        self.right_x = right_x
+        self.y = y
+
+        # Both eyes share one strip spanning from the left edge of one view to the right edge of the other
+        half = display_size // 2
+        self.origin_x = min(left_x, right_x) - half
+        self.origin_y = y - half
+        self.left_offset = left_x - half - self.origin_x
+        self.right_offset = right_x - half - self.origin_x
+        width = abs(right_x - left_x) + display_size
+        self.strip = np.zeros((display_size, width, 4), dtype=np.uint8)
+        self.strip[..., 3] = 255
+        self.resized = {}
+        return True
+
+    def compose(self, left_frame, right_frame):
+        """Render both eyes into the RGBA strip and return it; the buffer is reused every frame."""
+        size = self.display_size
+        self._render_eye("left", left_frame, self.strip[:, self.left_offset:self.left_offset + size])
+        self._render_eye("right", right_frame, self.strip[:, self.right_offset:self.right_offset + size])
+        return self.strip
+
+    def _render_eye(self, eye, frame, target):
+        size = self.display_size
+        resized = self.resized.get(eye)
+        if resized is None or resized.shape[2:] != frame.shape[2:]:
+            resized = np.empty((size, size) + frame.shape[2:], dtype=np.uint8)
+            self.resized[eye] = resized
+
+        # Bilinear is alias-free down to half size and much cheaper; area averaging beyond that
+        scale = size / max(frame.shape[0], frame.shape[1])
+        interpolation = cv2.INTER_AREA if scale < 0.5 else cv2.INTER_LINEAR
+        cv2.resize(frame, (size, size), dst=resized, interpolation=interpolation)
+
+        # Convert the already shrunk pixels straight into their place in the strip
+        if resized.ndim == 2:
+            cv2.cvtColor(resized, cv2.COLOR_GRAY2RGBA, dst=target)
+        else:
+            cv2.cvtColor(resized, cv2.COLOR_BGR2RGBA, dst=target)
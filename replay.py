@@ -0,0 +1,129 @@
+import os
+import cv2
+import time
+import threading
+from collections import deque
+from datetime import datetime
+from container import StereoWriter, EXTENSION
+
+
+class ReplayBuffer:
+    """Always-on pre-record buffer of the latest stereo pairs, JPEG-compressed in memory within a budget."""
+
+    def __init__(self, budget_mb=256, max_seconds=None, quality=90, arena=None):
+        self.budget = budget_mb * 1024 * 1024
+        self.max_seconds = max_seconds     # optional cap on the time span, on top of the memory budget
+        self.quality = quality
+        self.arena = arena
+        self.entries = deque()             # (timestamp, left_jpeg, right_jpeg), oldest first
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.reader = None
+        self.worker = None
+        self.running = False
+
+        # Counters
+        self.frames_encoded = 0
+        self.frames_evicted = 0
+
+    def start(self, reader):
+        """Start compressing every pair the given ring reader sees, on a background thread."""
+        self.reader = reader
+        self.running = True
+        self.worker = threading.Thread(target=self._run, name="replay-buffer", daemon=True)
+        self.worker.start()
+
+    def _run(self):
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        while self.running:
+            if not self.reader.wait(timeout=0.05):
+                continue
+            for left_frame, right_frame, timestamp, seq in self.reader.drain(self.arena):
+                _, left_data = cv2.imencode(".jpg", left_frame, params)
+                _, right_data = cv2.imencode(".jpg", right_frame, params)
+                if self.arena is not None:
+                    self.arena.release_pair((left_frame, right_frame))
+                self._add(timestamp, left_data, right_data)
+
+    def _add(self, timestamp, left_data, right_data):
+        with self.lock:
+            self.entries.append((timestamp, left_data, right_data))
+            self.bytes += left_data.nbytes + right_data.nbytes
+            self.frames_encoded += 1
+
+            # Evict the oldest pairs until back within budget
+            while self.entries and (self.bytes > self.budget or
+                                    (self.max_seconds and timestamp - self.entries[0][0] > self.max_seconds)):
+                _, old_left, old_right = self.entries.popleft()
+                self.bytes -= old_left.nbytes + old_right.nbytes
+                self.frames_evicted += 1
+
+    def seconds(self):
+        with self.lock:
+            if len(self.entries) < 2:
+                return 0.0
+            return self.entries[-1][0] - self.entries[0][0]
+
+    def flush(self, folder, fps, container=False, compression=None, on_finished=None):
+        """Write what the buffer holds right now to disk in the background; returns the writing thread."""
+        with self.lock:
+            entries = list(self.entries)
+        if not entries:
+            print("Warning: The replay buffer is empty.")
+            return None
+
+        thread = threading.Thread(target=self._write, args=(entries, folder, fps, container, compression, on_finished),
+                                  name="replay-flush", daemon=True)
+        thread.start()
+        return thread
+
+    def _write(self, entries, folder, fps, container, compression, on_finished):
+        # Name the files by when their first frame was captured so they sort before a recording started now
+        started = datetime.fromtimestamp(time.time() - (time.perf_counter() - entries[0][0]))
+        name = f"{started.strftime('%Y%m%d_%H%M%S')}_replay"
+        if container:
+            paths = [os.path.join(folder, f"{name}_stereo{EXTENSION}")]
+            writer = StereoWriter(paths[0], fps, compression)
+        else:
+            paths = [os.path.join(folder, f"{name}_{eye}_video.avi") for eye in ("left", "right")]
+            writers = None
+
+        for timestamp, left_data, right_data in entries:
+            left_frame = cv2.imdecode(left_data, cv2.IMREAD_COLOR)
+            right_frame = cv2.imdecode(right_data, cv2.IMREAD_COLOR)
+            if container:
+                writer.write(left_frame, right_frame, timestamp)
+                continue
+            if writers is None:
+                height, width = left_frame.shape[:2]
+                fourcc = cv2.VideoWriter_fourcc(*"XVID")
+                writers = [cv2.VideoWriter(path, fourcc, fps, (width, height)) for path in paths]
+            writers[0].write(left_frame)
+            writers[1].write(right_frame)
+
+        if container:
+            writer.close()
+        else:
+            for video_writer in writers:
+                video_writer.release()
+        print(f"Saved replay: {', '.join(paths)}")
+        if on_finished is not None:
+            on_finished(paths)
+
+    def stop(self):
+        self.running = False
+        if self.worker is not None:
+            self.worker.join(timeout=1.0)
+
+    def stats(self):
+        with self.lock:
+            frames = len(self.entries)
+            megabytes = self.bytes / (1024 * 1024)
+        return {
+            "frames": frames,
+            "seconds": self.seconds(),
+            "mb": megabytes,
+            "encoded": self.frames_encoded,
+            "evicted": self.frames_evicted,
+            "dropped": self.reader.dropped if self.reader is not None else 0,
+        }
@@ -0,0 +1,106 @@
+import math
+import time
+from collections import deque
+
+
+class FrameScheduler:
+    """Paces frame presentation against absolute deadlines on a monotonic clock."""
+
+    def __init__(self, fps=None, fallback_fps=30.0, window=120):
+        self.fallback_fps = fallback_fps
+        self.nominal_fps = None
+        self.next_deadline = None
+
+        # Recent history for measured source rate and achieved presentation rate
+        self.source_samples = deque(maxlen=window)
+        self.presented = deque(maxlen=window)
+
+        # Counters
+        self.frames_presented = 0
+        self.frames_skipped = 0
+
+        self.set_fps(fps)
+
+    @property
+    def fps(self):
+        """Target rate: the reported rate if valid, else the measured source rate, else the fallback."""
+        if self.nominal_fps:
+            return self.nominal_fps
+        measured = self.measured_fps()
+        return measured if measured else self.fallback_fps
+
+    @property
+    def interval(self):
+        return 1.0 / self.fps
+
+    def set_fps(self, fps):
+        """Set the reported rate; zero, negative or NaN rates fall back to measuring the source."""
+        if fps is not None and math.isfinite(fps) and fps > 0:
+            self.nominal_fps = float(fps)
+        else:
+            self.nominal_fps = None
+        self.source_samples.clear()
+        self.reset()
+
+    def reset(self):
+        """Restart the schedule from the next presented frame."""
+        self.next_deadline = None
+        self.presented.clear()
+
+    def observe_source(self, seq, timestamp):
+        """Record a source frame number and capture time, used when no rate is reported."""
+        self.source_samples.append((seq, timestamp))
+
+    def measured_fps(self):
+        if len(self.source_samples) < 2:
+            return None
+        first_seq, first_time = self.source_samples[0]
+        last_seq, last_time = self.source_samples[-1]
+        if last_time <= first_time:
+            return None
+        return (last_seq - first_seq) / (last_time - first_time)
+
+    def tick(self):
+        """Call after presenting a frame; returns (ms until the next deadline, frames to skip)."""
+        now = time.perf_counter()
+        self.presented.append(now)
+        self.frames_presented += 1
+
+        interval = self.interval
+        if self.next_deadline is None:
+            self.next_deadline = now
+        self.next_deadline += interval
+
+        # Behind schedule: skip the stale frames instead of queueing them up
+        skipped = 0
+        if self.next_deadline < now:
+            skipped = int((now - self.next_deadline) / interval) + 1
+            self.next_deadline += skipped * interval
+            self.frames_skipped += skipped
+
+        delay = max(int(round((self.next_deadline - now) * 1000)), 0)
+        return delay, skipped
+
+    def achieved_fps(self):
+        if len(self.presented) < 2:
+            return 0.0
+        return (len(self.presented) - 1) / (self.presented[-1] - self.presented[0])
+
+    def jitter_ms(self):
+        """Standard deviation of the presentation interval over the recent window."""
+        if len(self.presented) < 3:
+            return 0.0
+        times = list(self.presented)
+        intervals = [b - a for a, b in zip(times, times[1:])]
+        mean = sum(intervals) / len(intervals)
+        variance = sum((i - mean) ** 2 for i in intervals) / len(intervals)
+        return math.sqrt(variance) * 1000
+
+    def stats(self):
+        return {
+            "target_fps": self.fps,
+            "achieved_fps": self.achieved_fps(),
+            "jitter_ms": self.jitter_ms(),
+            "presented": self.frames_presented,
+            "skipped": self.frames_skipped,
+        }
@@ -0,0 +1,68 @@
+import cv2
+import numpy as np
+
+
+class FlatFieldAccumulator:
+    """Running mean of flat-field frames per eye on a coarse grid, without storing the frames."""
+
+    def __init__(self, grid=(64, 64)):
+        self.grid = grid      # (width, height); vignetting is smooth so a coarse grid is enough
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.means = {"left": None, "right": None}
+
+    def add(self, left_frame, right_frame):
+        self.count += 1
+        for eye, frame in (("left", left_frame), ("right", right_frame)):
+            small = cv2.resize(frame, self.grid, interpolation=cv2.INTER_AREA).astype(np.float32)
+            mean = self.means[eye]
+            if mean is None:
+                self.means[eye] = small
+            else:
+                mean += (small - mean) / self.count
+
+    def correction(self, max_gain=4.0):
+        """Derive per-channel gains that lift every grid cell to the brightest level of its channel."""
+        if self.count == 0:
+            return None
+        gains = {}
+        for eye, mean in self.means.items():
+            smoothed = cv2.GaussianBlur(mean, (5, 5), 0)
+            reference = smoothed.reshape(-1, smoothed.shape[-1]).max(axis=0)
+            gains[eye] = np.clip(reference / np.maximum(smoothed, 1.0), 1.0, max_gain).astype(np.float32)
+        return ShadingCorrection(gains["left"], gains["right"])
+
+
+class ShadingCorrection:
+    """Per-eye, per-channel gain maps applied as a single saturating multiply."""
+
+    def __init__(self, left_gain, right_gain):
+        self.grids = {"left": left_gain, "right": right_gain}
+        self.gains = {}       # full-resolution maps, expanded once per frame shape
+        self.outputs = {}
+
+    def save(self, path):
+        # The coarse grid in half precision is all that needs storing
+        np.savez_compressed(path, left=self.grids["left"].astype(np.float16),
+                            right=self.grids["right"].astype(np.float16))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["left"].astype(np.float32), data["right"].astype(np.float32))
+
+    def apply(self, left_frame, right_frame):
+        return self._apply("left", left_frame), self._apply("right", right_frame)
+
+    def _apply(self, eye, frame):
+        key = (eye, frame.shape)
+        gain = self.gains.get(key)
+        if gain is None:
+            height, width = frame.shape[:2]
+            gain = cv2.resize(self.grids[eye], (width, height), interpolation=cv2.INTER_LINEAR)
+            gain = gain.reshape(frame.shape)
+            self.gains[key] = gain
+            self.outputs[key] = np.empty_like(frame)
+        return cv2.multiply(frame, gain, dst=self.outputs[key], dtype=cv2.CV_8U)
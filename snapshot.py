@@ -0,0 +1,126 @@
+import os
+import cv2
+import time
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# Image formats and the OpenCV parameter their level sets
+FORMATS = {
+    "png": cv2.IMWRITE_PNG_COMPRESSION,     # 0-9, higher is smaller and slower
+    "jpg": cv2.IMWRITE_JPEG_QUALITY,        # 0-100
+    "tiff": None,
+}
+
+
+class SnapshotWriter:
+    """Saves source-resolution stereo pairs taken straight from the capture ring, encoding on a worker pool."""
+
+    def __init__(self, fmt="png", level=1, workers=2, max_pending_mb=1024, arena=None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown snapshot format '{fmt}', expected one of {', '.join(FORMATS)}")
+        self.fmt = fmt
+        self.level = level
+        self.arena = arena
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snapshot")
+        self.max_pending_bytes = max_pending_mb * 1024 * 1024
+        self.pending_bytes = 0
+        self.lock = threading.Lock()
+        self.burst_thread = None
+
+        # Counters
+        self.pairs_saved = 0
+        self.pairs_dropped = 0
+        self.encode_ms = 0.0
+
+    def params(self):
+        flag = FORMATS[self.fmt]
+        return [] if flag is None or self.level is None else [flag, int(self.level)]
+
+    def snapshot(self, ring, folder):
+        """Queue the newest captured pair for saving; returns False if there is none yet."""
+        copied = ring.copy_slot(ring.write_seq - 1, arena=self.arena) if ring.write_seq else None
+        if copied is None:
+            print("Error: No frame has been captured yet")
+            return False
+        left_frame, right_frame, _ = copied
+        name = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        return self.submit(left_frame, right_frame, folder, name)
+
+    def burst(self, ring, folder, seconds, on_finished=None):
+        """Save every captured pair for the given time on a background thread."""
+        if self.burst_thread is not None and self.burst_thread.is_alive():
+            print("Warning: A burst is already running.")
+            return None
+        reader = ring.reader("burst")
+        self.burst_thread = threading.Thread(target=self._burst, args=(reader, folder, seconds, on_finished),
+                                             name="snapshot-burst", daemon=True)
+        self.burst_thread.start()
+        return self.burst_thread
+
+    def _burst(self, reader, folder, seconds, on_finished):
+        session = datetime.now().strftime("%Y%m%d_%H%M%S")
+        deadline = time.perf_counter() + seconds
+        count = 0
+        while time.perf_counter() < deadline:
+            if not reader.wait(timeout=0.05):
+                continue
+            for left_frame, right_frame, timestamp, seq in reader.drain(self.arena):
+                if timestamp > deadline:
+                    self._release(left_frame, right_frame)
+                    continue
+                if self.submit(left_frame, right_frame, folder, f"{session}_burst{count:04d}"):
+                    count += 1
+        print(f"Burst captured {count} stereo pairs, {reader.dropped} missed by the ring")
+        if on_finished is not None:
+            on_finished(count)
+
+    def submit(self, left_frame, right_frame, folder, name):
+        """Queue a pair for encoding; pairs are dropped rather than queued past the memory limit."""
+        size = left_frame.nbytes + right_frame.nbytes
+        with self.lock:
+            if self.pending_bytes + size > self.max_pending_bytes:
+                self.pairs_dropped += 1
+                dropped = True
+            else:
+                self.pending_bytes += size
+                dropped = False
+        if dropped:
+            self._release(left_frame, right_frame)
+            return False
+        self.executor.submit(self._write, left_frame, right_frame, folder, name, size)
+        return True
+
+    def _write(self, left_frame, right_frame, folder, name, size):
+        start = time.perf_counter()
+        params = self.params()
+        left_path = os.path.join(folder, f"{name}_left_image.{self.fmt}")
+        right_path = os.path.join(folder, f"{name}_right_image.{self.fmt}")
+        saved = cv2.imwrite(left_path, left_frame, params) and cv2.imwrite(right_path, right_frame, params)
+        self._release(left_frame, right_frame)
+        with self.lock:
+            self.pending_bytes -= size
+            self.encode_ms += (time.perf_counter() - start) * 1000
+            if saved:
+                self.pairs_saved += 1
+        if not saved:
+            print(f"Error: Could not save stereo images: {left_path} and {right_path}")
+
+    def _release(self, left_frame, right_frame):
+        if self.arena is not None:
+            self.arena.release_pair((left_frame, right_frame))
+
+    def stats(self):
+        with self.lock:
+            return {
+                "saved": self.pairs_saved,
+                "dropped": self.pairs_dropped,
+                "pending_mb": self.pending_bytes / (1024 * 1024),
+                "encode_ms": self.encode_ms / self.pairs_saved if self.pairs_saved else 0.0,
+            }
+
+    def shutdown(self, wait=True):
+        """Finish the queued snapshots; a running burst stops submitting once its time is up."""
+        if self.burst_thread is not None:
+            self.burst_thread.join()
+        self.executor.shutdown(wait=wait)
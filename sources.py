@@ -0,0 +1,342 @@
+import os
+import cv2
+import time
+import platform
+import numpy as np
+
+BACKENDS = ("uvc", "depthai", "replay", "synthetic")
+
+
+def split_stereo(frame):
+    """Split a side-by-side camera frame into square left and right views."""
+    square_size = min(frame.shape[0], frame.shape[1])
+    left_frame = frame[:square_size, :square_size]
+    right_frame = frame[-square_size:, -square_size:]
+    return left_frame, right_frame
+
+
+def create_source(config=None):
+    """Build a frame source from a config dict; "backend" picks the class and the rest are its options."""
+    options = dict(config or {})
+    backend = options.pop("backend", "uvc")
+    if backend == "uvc":
+        return OpenCVStereoSource(**options)
+    if backend == "depthai":
+        return DepthAIStereoSource(**options)
+    if backend == "replay":
+        return ReplayStereoSource(**options)
+    if backend == "synthetic":
+        return SyntheticStereoSource(**options)
+    raise ValueError(f"Unknown frame source backend '{backend}', expected one of {', '.join(BACKENDS)}")
+
+
+def find_device(config=None):
+    """Cheaply check that the configured device is present, without opening it.
+
+    Returns a description of the device, or None if it is missing.
+    """
+    options = dict(config or {})
+    backend = options.get("backend", "uvc")
+    if backend == "uvc":
+        # Opening a missing camera can block for seconds, so look for its device node where there is one
+        device = options.get("device", 0)
+        if platform.system() == "Linux" and isinstance(device, int):
+            path = f"/dev/video{device}"
+            return path if os.path.exists(path) else None
+        return f"camera {device}"
+    if backend == "depthai":
+        import depthai as dai
+        devices = [info.getMxId() for info in dai.Device.getAllAvailableDevices()]
+        wanted = options.get("device_id")
+        if wanted:
+            return f"OAK {wanted}" if wanted in devices else None
+        return f"OAK {devices[0]}" if devices else None
+    if backend == "replay":
+        paths = (options.get("left_path"), options.get("right_path"))
+        return " and ".join(paths) if all(path and os.path.exists(path) for path in paths) else None
+    return f"{backend} camera"
+
+
+def open_source(config=None):
+    """Find and open the configured source; raises IOError if the device is missing or will not open."""
+    device = find_device(config)
+    if device is None:
+        raise IOError("Camera not found")
+    source = create_source(config)
+    if not source.isOpened():
+        source.release()
+        raise IOError(f"Could not open {device}")
+    source.description = device
+    return source
+
+
+class FrameSource:
+    """Delivers timestamped stereo pairs; every backend implements this interface."""
+
+    name = "source"
+    description = None    # description of the opened device, set by open_source
+
+    def isOpened(self):
+        return False
+
+    @property
+    def fps(self):
+        """Nominal pair rate of the source, 0 if unknown."""
+        return 0.0
+
+    def read(self):
+        """Return (ok, left, right, timestamp) with the timestamp on the perf_counter clock."""
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+
+class OpenCVStereoSource(FrameSource):
+    """Side-by-side stereo camera read through cv2.VideoCapture and split on the host."""
+
+    name = "uvc"
+
+    def __init__(self, device=0, width=None, height=None, fps=None, fourcc=None, capture=None):
+        # Any object with the VideoCapture read/get/set interface can stand in for a device
+        self.cap = capture if capture is not None else cv2.VideoCapture(device)
+        if fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        if width:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps:
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+        self.frame = None
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    @property
+    def fps(self):
+        return self.cap.get(cv2.CAP_PROP_FPS)
+
+    def read(self):
+        # Decode into the same buffer every time; the ring copies the views out
+        ret, frame = self.cap.read(self.frame)
+        timestamp = time.perf_counter()
+        if not ret:
+            return False, None, None, timestamp
+        self.frame = frame
+        left_frame, right_frame = split_stereo(frame)
+        return True, left_frame, right_frame, timestamp
+
+    def release(self):
+        if self.cap.isOpened():
+            self.cap.release()
+
+
+class DepthAIStereoSource(FrameSource):
+    """OAK camera pair where the device scales each eye and streams left and right separately."""
+
+    name = "depthai"
+
+    def __init__(self, output_size=(720, 720), fps=30.0, isp_scale=None, left_socket="CAM_B",
+                 right_socket="CAM_C", resolution="THE_800_P", queue_size=4, device_id=None):
+        import depthai as dai    # only needed when this backend is chosen
+        self.dai = dai
+        self.output_size = tuple(output_size)
+        self.configured_fps = float(fps)
+
+        pipeline = dai.Pipeline()
+        for stream, socket in (("left", left_socket), ("right", right_socket)):
+            camera = pipeline.create(dai.node.ColorCamera)
+            camera.setBoardSocket(getattr(dai.CameraBoardSocket, socket))
+            camera.setResolution(getattr(dai.ColorCameraProperties.SensorResolution, resolution))
+            camera.setFps(self.configured_fps)
+            if isp_scale:
+                camera.setIspScale(*isp_scale)
+
+            # The preview output is resized and converted to interleaved BGR on the device
+            camera.setPreviewSize(*self.output_size)
+            camera.setInterleaved(True)
+            camera.setColorOrder(dai.ColorCameraProperties.ColorOrder.BGR)
+
+            output = pipeline.create(dai.node.XLinkOut)
+            output.setStreamName(stream)
+            camera.preview.link(output.input)
+
+        if device_id:
+            self.device = dai.Device(pipeline, dai.DeviceInfo(device_id))
+        else:
+            self.device = dai.Device(pipeline)
+        self.queues = {stream: self.device.getOutputQueue(stream, maxSize=queue_size, blocking=False)
+                       for stream in ("left", "right")}
+        self.pending = {"left": {}, "right": {}}    # unmatched frames by sequence number
+
+    def isOpened(self):
+        return self.device is not None and not self.device.isClosed()
+
+    @property
+    def fps(self):
+        return self.configured_fps
+
+    def read(self, timeout=1.0):
+        """Wait for a left and right frame with the same sequence number."""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            for stream, queue in self.queues.items():
+                message = queue.tryGet()
+                if message is not None:
+                    self.pending[stream][message.getSequenceNum()] = message
+
+            matched = self.pending["left"].keys() & self.pending["right"].keys()
+            if matched:
+                seq = max(matched)
+                left = self.pending["left"][seq]
+                right = self.pending["right"][seq]
+
+                # Frames older than the matched pair will never be paired now
+                for stream in ("left", "right"):
+                    self.pending[stream] = {key: value for key, value in self.pending[stream].items() if key > seq}
+                return True, left.getCvFrame(), right.getCvFrame(), self._host_time(left)
+            time.sleep(0.001)
+        return False, None, None, time.perf_counter()
+
+    def _host_time(self, message):
+        # Device timestamps are synced to the host's monotonic clock; move them onto perf_counter
+        age = (self.dai.Clock.now() - message.getTimestamp()).total_seconds()
+        return time.perf_counter() - age
+
+    def release(self):
+        if self.device is not None:
+            self.device.close()
+            self.device = None
+
+
+class ReplayStereoSource(FrameSource):
+    """Plays a recorded left and right video pair as if it were a live camera."""
+
+    name = "replay"
+
+    def __init__(self, left_path, right_path, loop=True, paced=True):
+        self.left_cap = cv2.VideoCapture(left_path)
+        self.right_cap = cv2.VideoCapture(right_path)
+        self.loop = loop
+        self.paced = paced        # deliver pairs at the file frame rate rather than as fast as possible
+        self.next_deadline = None
+        self.frames = (None, None)
+
+    def isOpened(self):
+        return self.left_cap.isOpened() and self.right_cap.isOpened()
+
+    @property
+    def fps(self):
+        return self.left_cap.get(cv2.CAP_PROP_FPS)
+
+    def read(self):
+        if self.paced and self.fps:
+            now = time.perf_counter()
+            if self.next_deadline is None:
+                self.next_deadline = now
+            self.next_deadline += 1.0 / self.fps
+            if self.next_deadline > now:
+                time.sleep(self.next_deadline - now)
+
+        ret_left, left_frame = self.left_cap.read(self.frames[0])
+        ret_right, right_frame = self.right_cap.read(self.frames[1])
+        if not (ret_left and ret_right) and self.loop:
+            self.left_cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self.right_cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret_left, left_frame = self.left_cap.read(self.frames[0])
+            ret_right, right_frame = self.right_cap.read(self.frames[1])
+        timestamp = time.perf_counter()
+        if not (ret_left and ret_right):
+            return False, None, None, timestamp
+        self.frames = (left_frame, right_frame)
+        return True, left_frame, right_frame, timestamp
+
+    def release(self):
+        self.left_cap.release()
+        self.right_cap.release()
+
+
+class SyntheticStereoSource(OpenCVStereoSource):
+    """Generated side-by-side test pattern, for running without any hardware."""
+
+    name = "synthetic"
+
+    def __init__(self, width=2560, height=720, fps=30.0, jitter=0.0, drop_rate=0.0, seed=0):
+        super().__init__(capture=SyntheticStereoCamera(width, height, fps, jitter, drop_rate, seed=seed))
+
+
+class SyntheticStereoCamera:
+    """Stand-in for cv2.VideoCapture producing side-by-side stereo test frames."""
+
+    def __init__(self, width=2560, height=720, fps=30.0, jitter=0.0, drop_rate=0.0, pattern_frames=4, seed=0):
+        self.width = width
+        self.height = height
+        self.fps = fps                  # 0 delivers frames as fast as they are read
+        self.jitter = jitter            # standard deviation of frame arrival, in seconds
+        self.drop_rate = drop_rate      # probability that a read fails
+        self.random = np.random.default_rng(seed)
+        self.opened = True
+        self.frames_read = 0
+        self.next_deadline = None
+
+        # Pregenerate a short loop of frames so producing one costs a single copy
+        self.patterns = [self._make_pattern(index, pattern_frames) for index in range(pattern_frames)]
+
+    def _make_pattern(self, index, count):
+        """Moving diagonal gradient per eye, with the right eye shifted to give some disparity."""
+        square_size = min(self.width, self.height)
+        ramp = np.linspace(0, 255, square_size, dtype=np.float32)
+        shift = index * square_size // count
+        eye = (ramp[None, :] + ramp[:, None] + shift) % 256
+        frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        frame[:square_size, :square_size, 0] = eye
+        frame[:square_size, :square_size, 1] = 255 - eye
+        frame[:square_size, :square_size, 2] = index * 255 // max(count - 1, 1)
+        right = np.roll(frame[:square_size, :square_size], square_size // 50, axis=1)
+        frame[-square_size:, -square_size:] = right
+        return frame
+
+    def isOpened(self):
+        return self.opened
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        return 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def read(self, image=None):
+        if not self.opened:
+            return False, None
+
+        # Pace reads to the configured frame rate like a real device would
+        if self.fps:
+            now = time.perf_counter()
+            if self.next_deadline is None:
+                self.next_deadline = now
+            self.next_deadline += 1.0 / self.fps
+            wait = self.next_deadline - now
+            if self.jitter:
+                wait += self.random.normal(0.0, self.jitter)
+            if wait > 0:
+                time.sleep(wait)
+
+        if self.drop_rate and self.random.random() < self.drop_rate:
+            return False, None
+
+        pattern = self.patterns[self.frames_read % len(self.patterns)]
+        self.frames_read += 1
+        if image is None or image.shape != pattern.shape or image.dtype != pattern.dtype:
+            image = np.empty_like(pattern)
+        np.copyto(image, pattern)
+        return True, image
+
+    def release(self):
+        self.opened = False
@@ -0,0 +1,236 @@
+import cv2
+import json
+import time
+import threading
+import numpy as np
+from collections import deque
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Quality tiers offered to viewers: JPEG quality and scale of the side-by-side frame
+TIERS = {
+    "high": {"quality": 85, "scale": 1.0},
+    "low": {"quality": 60, "scale": 0.5},
+}
+BOUNDARY = "stereoframe"
+PAGE = """<html><head><title>Endoscope stream</title></head>
+<body style="margin:0;background:#000"><img src="/stream?tier={tier}" style="width:100%"></body></html>"""
+
+
+class EncodedFrame:
+    """One JPEG shared by every viewer of a tier; seq counts encoded frames, so gaps are frames a viewer missed."""
+
+    def __init__(self, seq, timestamp, data):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.data = data
+
+
+class ClientStats:
+    """Throughput and capture-to-send latency of one connected viewer."""
+
+    def __init__(self, address, tier, window=120):
+        self.address = f"{address[0]}:{address[1]}"
+        self.tier = tier
+        self.connected = time.perf_counter()
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+        self.latencies = deque(maxlen=window)
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.connected, 1e-6)
+        latencies = sorted(self.latencies)
+        return {
+            "address": self.address,
+            "tier": self.tier,
+            "fps": self.frames_sent / elapsed,
+            "mbit_s": self.bytes_sent * 8 / elapsed / 1e6,
+            "sent": self.frames_sent,
+            "dropped": self.frames_dropped,
+            "latency_ms": latencies[len(latencies) // 2] if latencies else None,
+            "latency_p95_ms": latencies[int(len(latencies) * 0.95)] if latencies else None,
+        }
+
+
+class StreamServer:
+    """MJPEG over HTTP fed from the capture ring; each pair is encoded once per tier and shared by all viewers."""
+
+    def __init__(self, ring, host="127.0.0.1", port=8080, max_fps=30.0, tiers=None):
+        self.reader = ring.reader("stream")
+        self.host = host
+        self.port = port
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.tiers = tiers or TIERS
+        self.latest = {tier: None for tier in self.tiers}   # newest EncodedFrame per tier
+        self.viewers = {tier: 0 for tier in self.tiers}
+        self.clients = []
+        self.new_frame = threading.Condition()
+        self.running = False
+        self.pair = None
+        self.strip = None
+
+        # Counters
+        self.frames_encoded = 0
+        self.encode_ms = 0.0
+
+        handler = type("StreamHandler", (StreamHandler,), {"server_ref": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]     # the real port when 0 was asked for
+
+    def start(self):
+        self.running = True
+        self.encoder = threading.Thread(target=self._encode_loop, name="stream-encode", daemon=True)
+        self.encoder.start()
+        self.serve_thread = threading.Thread(target=self.httpd.serve_forever, name="stream-http", daemon=True)
+        self.serve_thread.start()
+        print(f"Streaming on http://{self.host}:{self.port}/")
+
+    def _encode_loop(self):
+        last = 0.0
+        while self.running:
+            if not any(self.viewers.values()):
+                time.sleep(0.05)
+                continue
+            if not self.reader.wait(timeout=0.1):
+                continue
+
+            # Never encode faster than viewers are served, and always the newest pair only
+            wait = last + self.min_interval - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            latest = self.reader.latest(out=self.pair)
+            if latest is None:
+                continue
+            left_frame, right_frame, timestamp, seq = latest
+            self.pair = (left_frame, right_frame)
+            last = time.perf_counter()
+
+            # Viewers get both eyes side by side
+            height = min(left_frame.shape[0], right_frame.shape[0])
+            width = left_frame.shape[1] + right_frame.shape[1]
+            if self.strip is None or self.strip.shape[:2] != (height, width):
+                self.strip = np.empty((height, width, 3), np.uint8)
+            self.strip[:, :left_frame.shape[1]] = left_frame[:height]
+            self.strip[:, left_frame.shape[1]:] = right_frame[:height]
+
+            start = time.perf_counter()
+            encoded = {}
+            for tier, settings in self.tiers.items():
+                if not self.viewers[tier]:
+                    continue
+                image = self.strip
+                if settings["scale"] != 1.0:
+                    image = cv2.resize(self.strip, None, fx=settings["scale"], fy=settings["scale"],
+                                       interpolation=cv2.INTER_AREA)
+                _, data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, settings["quality"]])
+                encoded[tier] = EncodedFrame(self.frames_encoded, timestamp, data.tobytes())
+            self.encode_ms += (time.perf_counter() - start) * 1000
+            self.frames_encoded += 1
+
+            with self.new_frame:
+                self.latest.update(encoded)
+                self.new_frame.notify_all()
+
+    def wait_frame(self, tier, last_seq, timeout=1.0):
+        """Block until a frame newer than last_seq exists for the tier; returns it or None."""
+        with self.new_frame:
+            self.new_frame.wait_for(lambda: not self.running or (
+                self.latest[tier] is not None and self.latest[tier].seq > last_seq), timeout)
+            frame = self.latest[tier]
+        if frame is None or frame.seq <= last_seq:
+            return None
+        return frame
+
+    def add_client(self, stats):
+        with self.new_frame:
+            self.clients.append(stats)
+            self.viewers[stats.tier] += 1
+
+    def remove_client(self, stats):
+        with self.new_frame:
+            self.clients.remove(stats)
+            self.viewers[stats.tier] -= 1
+            if not self.viewers[stats.tier]:
+                self.latest[stats.tier] = None
+
+    def stats(self):
+        with self.new_frame:
+            clients = list(self.clients)
+        return {
+            "encoded": self.frames_encoded,
+            "encode_ms": self.encode_ms / self.frames_encoded if self.frames_encoded else 0.0,
+            "clients": [client.summary() for client in clients],
+        }
+
+    def stop(self):
+        self.running = False
+        with self.new_frame:
+            self.new_frame.notify_all()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    """Serves the viewer page, the MJPEG streams and the statistics of a StreamServer."""
+
+    server_ref = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        tier = query.get("tier", ["high"])[0]
+        if tier not in self.server_ref.tiers:
+            self.send_error(404, f"Unknown tier '{tier}'")
+        elif url.path == "/":
+            self._send(200, "text/html", PAGE.format(tier=tier).encode())
+        elif url.path == "/stats":
+            self._send(200, "application/json", json.dumps(self.server_ref.stats(), indent=2).encode())
+        elif url.path == "/stream":
+            self._stream(tier)
+        else:
+            self.send_error(404)
+
+    def _send(self, code, content_type, body):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, tier):
+        server = self.server_ref
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.connection.settimeout(5.0)   # a viewer that stops reading is dropped, not waited on
+
+        stats = ClientStats(self.client_address, tier)
+        server.add_client(stats)
+        last_seq = -1
+        try:
+            while server.running:
+                frame = server.wait_frame(tier, last_seq)
+                if frame is None:
+                    continue
+
+                # A viewer slower than the encoder simply skips to the newest frame
+                if last_seq >= 0:
+                    stats.frames_dropped += max(frame.seq - last_seq - 1, 0)
+                last_seq = frame.seq
+                self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                 f"Content-Length: {len(frame.data)}\r\n\r\n".encode())
+                self.wfile.write(frame.data)
+                self.wfile.write(b"\r\n")
+                stats.frames_sent += 1
+                stats.bytes_sent += len(frame.data)
+                stats.latencies.append((time.perf_counter() - frame.timestamp) * 1000)
+        except OSError:
+            pass      # viewer disconnected or timed out
+        finally:
+            server.remove_client(stats)
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,156 @@
+import cv2
+import time
+import numpy as np
+import pytest
+from capture import FrameRing, CaptureThread
+from sources import FrameSource, create_source, open_source
+import sources
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def write_video(path, frames, fps=30.0):
+    height, width = frames[0].shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+
+
+@pytest.fixture
+def replay_config(tmp_path):
+    """Three-frame left and right videos, each frame a flat grey level."""
+    paths = {}
+    for eye, offset in (("left", 0), ("right", 100)):
+        path = str(tmp_path / f"{eye}_video.avi")
+        write_video(path, [np.full((64, 64, 3), offset + 40 * index, np.uint8) for index in range(3)])
+        paths[f"{eye}_path"] = path
+    return {"backend": "replay", "paced": False, **paths}
+
+
+def test_synthetic_source_delivers_square_pairs():
+    source = create_source({"backend": "synthetic", "width": 320, "height": 160, "fps": 0})
+    ok, left_frame, right_frame, timestamp = source.read()
+    assert ok and source.isOpened()
+    assert left_frame.shape == right_frame.shape == (160, 160, 3)
+    assert timestamp <= time.perf_counter()
+    source.release()
+    assert not source.isOpened()
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_source({"backend": "nope"})
+
+
+def test_replay_source_loops(replay_config):
+    source = create_source(replay_config)
+    levels = []
+    for _ in range(4):
+        ok, left_frame, right_frame, _ = source.read()
+        assert ok
+        levels.append((int(left_frame.mean()), int(right_frame.mean())))
+    source.release()
+
+    # MJPEG is lossy, so compare grey levels loosely; the fourth read wraps to the first frame
+    assert all(abs(left - 40 * index) <= 2 and abs(right - 100 - 40 * index) <= 2
+               for index, (left, right) in enumerate(levels[:3]))
+    assert abs(levels[3][0] - levels[0][0]) <= 2
+
+
+def test_replay_source_stops_without_loop(replay_config):
+    source = create_source(dict(replay_config, loop=False))
+    results = [source.read()[0] for _ in range(4)]
+    source.release()
+    assert results == [True, True, True, False]
+
+
+def test_open_source_describes_device(replay_config):
+    source = open_source(replay_config)
+    assert source.isOpened()
+    assert source.description == f"{replay_config['left_path']} and {replay_config['right_path']}"
+    source.release()
+
+
+def test_open_source_missing_replay_files(tmp_path):
+    config = {"backend": "replay", "left_path": str(tmp_path / "left.avi"), "right_path": str(tmp_path / "right.avi")}
+    with pytest.raises(IOError):
+        open_source(config)
+
+
+def test_open_source_keeps_backend_attributes(monkeypatch):
+    """Backends keep their own handles, like DepthAIStereoSource.device, usable after open_source."""
+
+    class Handle:
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    class HandleSource(FrameSource):
+        def __init__(self):
+            self.device = Handle()
+
+        def isOpened(self):
+            return not self.device.closed
+
+        def release(self):
+            self.device.close()
+
+    monkeypatch.setattr(sources, "create_source", lambda config: HandleSource())
+    source = open_source({"backend": "synthetic"})
+    assert source.isOpened()
+    source.release()
+    assert not source.isOpened()
+
+
+def test_capture_thread_retries_and_reconnects():
+    attempts = []
+
+    def opener():
+        attempts.append(time.perf_counter())
+        if len(attempts) < 3:
+            raise IOError("Camera not found")
+        return open_source({"backend": "synthetic", "width": 128, "height": 64, "fps": 100})
+
+    ring = FrameRing()
+    capture_thread = CaptureThread(None, ring, retry_delay=0.01, open_source=opener,
+                                   reconnect_after=0.1, reopen_delay=0.01)
+    capture_thread.start()
+    try:
+        assert wait_until(lambda: ring.write_seq >= 5)
+        assert capture_thread.connects == 1 and len(attempts) == 3
+        assert capture_thread.streaming
+
+        # Unplugging makes every read fail; the thread reopens the device and frames resume
+        capture_thread.source.cap.release()
+        assert wait_until(lambda: capture_thread.connects == 2)
+        written = ring.write_seq
+        assert wait_until(lambda: ring.write_seq >= written + 5)
+    finally:
+        capture_thread.stop()
+    assert not capture_thread.is_alive()
+
+
+@pytest.mark.parametrize("error", [ValueError("Unknown frame source backend"), ImportError("No module named 'x'")])
+def test_capture_thread_stops_on_configuration_errors(error):
+    def opener():
+        raise error
+
+    capture_thread = CaptureThread(None, FrameRing(), open_source=opener)
+    capture_thread.start()
+    capture_thread.join(2.0)
+    assert not capture_thread.is_alive()
+    assert capture_thread.status.startswith("Error:")
+
+
+def test_empty_ring_has_no_newest_pair():
+    ring = FrameRing(slots=8)
+    assert ring.copy_slot(ring.write_seq - 1) is None